@@ -13,44 +13,68 @@ from collections import defaultdict
 import shutil
 from datetime import datetime
 
+# orjson parses and serializes several times faster than the stdlib json
+# module and writes UTF-8 bytes directly; fall back to json if missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Set UTF-8 encoding for output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+def load_database(database_file):
+    """Load the vowel pattern database"""
+    with open(database_file, 'rb') as f:
+        if orjson is not None:
+            return orjson.loads(f.read())
+        return json.load(f)
+
+def save_database(data, database_file):
+    """Write the vowel pattern database as 2-space indented UTF-8 JSON"""
+    if orjson is not None:
+        with open(database_file, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(database_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
 def generate_pattern_ids(pattern, tags):
     """Generate both abbreviated and long IDs for a pattern"""
 
-    # Extract components from tags
-    sound = next((t.replace('sound_', '') for t in tags if t.startswith('sound_')), 'X')
-    length = next((t.replace('length_', '') for t in tags if t.startswith('length_')), 'X')
-    openness = next((t.replace('vowel_', '') for t in tags if t.startswith('vowel_')), 'X')
-
-    # Detect glides
-    has_jglide = 'glide_j' in tags or pattern.endswith('ย')
-    has_wglide = 'glide_w' in tags or pattern.endswith('ว')
-
-    # Build abbreviated ID with underscores
-    abbrev_parts = [sound]
-    abbrev_parts.append(length[0] if length != 'X' else 'X')
-    abbrev_parts.append(openness[0] if openness != 'X' else 'X')
-
-    if has_jglide:
-        abbrev_parts.append('jg')
-    elif has_wglide:
-        abbrev_parts.append('wg')
-
-    abbrev_base = '_'.join(abbrev_parts)
-
-    # Build long ID - clean format without verbose labels
-    long_parts = [sound]
-    long_parts.append(length if length != 'X' else 'X')
-    long_parts.append(openness if openness != 'X' else 'X')
-
-    if has_jglide:
-        long_parts.append('jglide')
-    elif has_wglide:
-        long_parts.append('wglide')
-
-    long_base = '_'.join(long_parts)
+    # Extract components from tags in a single pass (first tag of each kind wins)
+    sound = length = openness = None
+    has_jglide = has_wglide = False
+    for tag in tags:
+        if tag.startswith('sound_'):
+            if sound is None:
+                sound = tag[6:]
+        elif tag.startswith('length_'):
+            if length is None:
+                length = tag[7:]
+        elif tag.startswith('vowel_'):
+            if openness is None:
+                openness = tag[6:]
+        elif tag == 'glide_j':
+            has_jglide = True
+        elif tag == 'glide_w':
+            has_wglide = True
+    sound = 'X' if sound is None else sound
+    length = 'X' if length is None else length
+    openness = 'X' if openness is None else openness
+
+    # Detect glides (j-glide takes precedence)
+    if has_jglide or pattern.endswith('ย'):
+        abbrev_glide, long_glide = '_jg', '_jglide'
+    elif has_wglide or pattern.endswith('ว'):
+        abbrev_glide, long_glide = '_wg', '_wglide'
+    else:
+        abbrev_glide = long_glide = ''
+
+    # Abbreviated ID uses the first letter of length/openness; long ID is
+    # the clean format without verbose labels
+    abbrev_base = f"{sound}_{length[0]}_{openness[0]}{abbrev_glide}"
+    long_base = f"{sound}_{length}_{openness}{long_glide}"
 
     return abbrev_base, long_base
 
@@ -67,12 +91,12 @@ def add_ids_to_database(input_file, output_file=None):
         output_file = input_file
 
     # Load the database
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_database(input_file)
 
     # Track duplicates for numbering
     abbrev_counts = defaultdict(int)
     long_counts = defaultdict(int)
+    patterns_by_abbrev_base = defaultdict(list)  # For the duplicate report
 
     # Process each pattern
     patterns_processed = 0
@@ -99,12 +123,12 @@ def add_ids_to_database(input_file, output_file=None):
         # Add IDs to pattern info
         info['abbrev_id'] = abbrev_id
         info['long_id'] = long_id
+        patterns_by_abbrev_base[abbrev_base].append(f"{pattern} → {abbrev_id}")
 
         patterns_processed += 1
 
     # Save updated database
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    save_database(data, output_file)
 
     print(f"\nProcessed {patterns_processed} patterns")
     print(f"Database updated: {output_file}")
@@ -117,12 +141,8 @@ def add_ids_to_database(input_file, output_file=None):
         print(f"\nAbbreviated ID duplicates ({len(duplicate_abbrevs)}):")
         for base, count in duplicate_abbrevs.items():
             print(f"  {base}: {count} patterns")
-            # Find and display the patterns
-            patterns_with_this_base = []
-            for pattern, info in data['patterns'].items():
-                if info['abbrev_id'].startswith(base):
-                    patterns_with_this_base.append(f"{pattern} → {info['abbrev_id']}")
-            for p in patterns_with_this_base[:3]:  # Show first 3
+            # Display the patterns collected during processing
+            for p in patterns_by_abbrev_base[base][:3]:  # Show first 3
                 print(f"    {p}")
 
     return data
@@ -130,8 +150,7 @@ def add_ids_to_database(input_file, output_file=None):
 def verify_ids(database_file):
     """Verify that all IDs are unique and properly formatted"""
 
-    with open(database_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_database(database_file)
 
     abbrev_ids = {}
     long_ids = {}
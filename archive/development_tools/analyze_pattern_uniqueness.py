@@ -6,12 +6,37 @@ import sys
 import io
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Set UTF-8 encoding for output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 # Load the vowel patterns
-with open('thai_vowels_tagged_9-21-2025-2-31-pm.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+with open('thai_vowels_tagged_9-21-2025-2-31-pm.json', 'rb') as f:
+    data = orjson.loads(f.read()) if orjson is not None else json.load(f)
+
+VOWEL_TYPES = ('monophthong', 'diphthong', 'triphthong')
+
+def classify_tags(tags):
+    """Pick out sound/length/type/openness in one pass (first tag of each kind wins)"""
+    components = {'sound': None, 'length': None, 'type': None, 'openness': None}
+    for t in tags:
+        if t.startswith('sound_'):
+            key, value = 'sound', t[6:]
+        elif t.startswith('length_'):
+            key, value = 'length', t[7:]
+        elif t.startswith('vowel_'):
+            key, value = 'openness', t[6:]
+        elif t in VOWEL_TYPES:
+            key, value = 'type', t
+        else:
+            continue
+        if components[key] is None:
+            components[key] = value
+    return components
 
 patterns_by_id = defaultdict(list)
 pattern_details = {}
@@ -20,27 +45,21 @@ for pattern, info in data['patterns'].items():
     tags = info.get('tags', [])
 
     # Extract tag components
-    sound = [t.replace('sound_', '') for t in tags if t.startswith('sound_')]
-    length = [t.replace('length_', '') for t in tags if t.startswith('length_')]
-    vowel_type = [t for t in tags if t in ['monophthong', 'diphthong', 'triphthong']]
-    openness = [t.replace('vowel_', '') for t in tags if t.startswith('vowel_')]
+    details = classify_tags(tags)
+    sound = details['sound'] if details['sound'] is not None else 'X'
+    length = details['length']
+    vowel_type = details['type']
+    openness = details['openness']
 
     # Try different ID schemes
-    id1 = f"{sound[0] if sound else 'X'}_{length[0][0] if length else 'X'}"  # e.g., "a_s" for short a
-    id2 = f"{sound[0] if sound else 'X'}_{length[0] if length else 'X'}_{vowel_type[0][0] if vowel_type else 'X'}"  # e.g., "a_short_m"
-    id3 = f"{sound[0] if sound else 'X'}_{length[0][0] if length else 'X'}_{openness[0][0] if openness else 'X'}"  # e.g., "a_s_o" for short open a
+    id1 = f"{sound}_{length[0] if length is not None else 'X'}"  # e.g., "a_s" for short a
+    id2 = f"{sound}_{length if length is not None else 'X'}_{vowel_type[0] if vowel_type else 'X'}"  # e.g., "a_short_m"
+    id3 = f"{sound}_{length[0] if length is not None else 'X'}_{openness[0] if openness is not None else 'X'}"  # e.g., "a_s_o" for short open a
 
     # Store for analysis
     patterns_by_id[id1].append(pattern)
-    pattern_details[pattern] = {
-        'sound': sound[0] if sound else None,
-        'length': length[0] if length else None,
-        'type': vowel_type[0] if vowel_type else None,
-        'openness': openness[0] if openness else None,
-        'id1': id1,
-        'id2': id2,
-        'id3': id3
-    }
+    details.update(id1=id1, id2=id2, id3=id3)
+    pattern_details[pattern] = details
 
 # Analyze each ID scheme
 print("=" * 70)
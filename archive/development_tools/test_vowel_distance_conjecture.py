@@ -6,47 +6,83 @@ some vowel part p is AT MOST 2 characters away (inclusive).
 
 import sys
 import io
+from pathlib import Path
 
 # Set UTF-8 encoding
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+# Add parent directory for imports
+sys.path.append(str(Path(__file__).parent.parent))
+from prototype_algorithms.thai_charsets import (
+    CONSONANTS, VOWEL_MARKS as VOWEL_SIGNS, TONE_MARKS, THANTHAKHAT
+)
+
 # Character sets
-CONSONANTS = {
-    'ก', 'ข', 'ฃ', 'ค', 'ฅ', 'ฆ', 'ง', 'จ', 'ฉ', 'ช', 'ซ', 'ฌ', 'ญ',
-    'ฎ', 'ฏ', 'ฐ', 'ฑ', 'ฒ', 'ณ', 'ด', 'ต', 'ถ', 'ท', 'ธ', 'น', 'บ',
-    'ป', 'ผ', 'ฝ', 'พ', 'ฟ', 'ภ', 'ม', 'ย', 'ร', 'ล', 'ว', 'ศ', 'ษ',
-    'ส', 'ห', 'ฬ', 'อ', 'ฮ'
-}
-
-VOWEL_MARKS = {
-    'ะ', 'ั', 'า', 'ำ', 'ิ', 'ี', 'ึ', 'ื', 'ุ', 'ู',
-    'เ', 'แ', 'โ', 'ใ', 'ไ', '็', '์'  # Including ์ (cancellation mark) as it's vowel-related
-}
-
-TONE_MARKS = {'่', '้', '๊', '๋'}
-
-def find_nearest_vowel_distance(text, pos):
-    """Find distance to nearest vowel mark from position pos"""
-    min_distance = float('inf')
-
-    # Check characters before and after
-    for i in range(len(text)):
-        if text[i] in VOWEL_MARKS:
-            distance = abs(i - pos)
-            min_distance = min(min_distance, distance)
-            if min_distance == 0:  # Adjacent vowel found
-                break
-
-    return min_distance
+VOWEL_MARKS = VOWEL_SIGNS | {THANTHAKHAT}  # Including ์ (cancellation mark) as it's vowel-related
+
+class _CharClassTable(dict):
+    """str.translate table: C/V/T for Thai classes, '?' for everything else"""
+    def __missing__(self, codepoint):
+        return '?'
+
+CHAR_CLASS_TABLE = _CharClassTable(
+    {ord(c): 'C' for c in CONSONANTS}
+    | {ord(c): 'V' for c in VOWEL_MARKS}
+    | {ord(c): 'T' for c in TONE_MARKS}
+)
+
+def classify_text(text):
+    """Classify every character in one C-level str.translate pass.
+
+    Returns a string the same length as text whose characters are the
+    class codes 'C', 'V', 'T' or '?'.
+    """
+    return text.translate(CHAR_CLASS_TABLE)
+
+def compute_vowel_distances(char_classes):
+    """Distance from every position to its nearest vowel mark.
+
+    Takes the output of classify_text. Vowel positions are located with
+    str.find (a C-level scan), and the distances between consecutive vowels
+    are filled in from ranges rather than one character at a time.
+    """
+    text_length = len(char_classes)
+
+    vowel_positions = []
+    pos = char_classes.find('V')
+    while pos != -1:
+        vowel_positions.append(pos)
+        pos = char_classes.find('V', pos + 1)
+
+    if not vowel_positions:
+        return [float('inf')] * text_length
+
+    # Before the first vowel: counting down to it
+    distances = list(range(vowel_positions[0], 0, -1))
+
+    # Between consecutive vowels: rising from one, then falling to the next
+    for prev_vowel, next_vowel in zip(vowel_positions, vowel_positions[1:]):
+        gap = next_vowel - prev_vowel
+        half = gap // 2
+        distances.extend(range(0, half + 1))
+        distances.extend(range(gap - half - 1, 0, -1))
+
+    # From the last vowel to the end of the text
+    distances.extend(range(0, text_length - vowel_positions[-1]))
+
+    return distances
 
 def test_conjecture(text):
     """Test if every consonant has a vowel within 2 characters"""
     violations = []
     consonant_distances = []
+    char_classes = classify_text(text)
+    vowel_distances = compute_vowel_distances(char_classes)
 
-    for i, char in enumerate(text):
-        if char in CONSONANTS:
-            distance = find_nearest_vowel_distance(text, i)
+    for i, char_class in enumerate(char_classes):
+        if char_class == 'C':
+            char = text[i]
+            distance = vowel_distances[i]
             consonant_distances.append((i, char, distance))
 
             if distance > 2:
@@ -62,14 +98,7 @@ def analyze_text(text, name=""):
 
     # Show character breakdown
     print("Character breakdown:")
-    for i, char in enumerate(text):
-        char_type = "?"
-        if char in CONSONANTS:
-            char_type = "C"
-        elif char in VOWEL_MARKS:
-            char_type = "V"
-        elif char in TONE_MARKS:
-            char_type = "T"
+    for i, (char, char_type) in enumerate(zip(text, classify_text(text))):
         print(f"  [{i}] {char} : {char_type}")
 
     # Test conjecture
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Shared Aho-Corasick automaton over the literal fragments of vowel patterns
+(the text between the 'x'/'f' placeholders), used by the prototype
+detectors to find which fragments - and where - occur in a text in one pass.
+"""
+
+import re
+from collections import deque
+from typing import Iterator, Set, Tuple
+
+class FragmentAutomaton:
+    """
+    Aho-Corasick automaton over the literal fragments of the vowel patterns.
+
+    One pass over a text reports every fragment that occurs in it, however
+    many fragments there are.
+    """
+
+    def __init__(self, fragments):
+        self.goto = [{}]       # state -> {char: next state}
+        self.fail = [0]        # state -> failure link
+        self.output = [set()]  # state -> fragments ending at this state
+
+        # Build the trie
+        for fragment in fragments:
+            state = 0
+            for char in fragment:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].add(fragment)
+
+        # Breadth-first pass to set failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+        # The root's outgoing characters (every fragment's first character)
+        # as one character class, so scanning can skip text that cannot
+        # start a fragment. Not usable if an empty fragment matches anywhere.
+        if self.goto[0] and not self.output[0]:
+            self.root_pattern = re.compile(
+                '[' + ''.join(re.escape(char) for char in sorted(self.goto[0])) + ']')
+        else:
+            self.root_pattern = None
+
+    def find_fragments(self, text: str) -> Set[str]:
+        """Return the set of fragments occurring anywhere in text"""
+        found = set()
+        for _, fragment in self.iter_hits(text):
+            found.add(fragment)
+        return found
+
+    def iter_hits(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (end_index, fragment) for every occurrence of every fragment"""
+        goto, fail, output = self.goto, self.fail, self.output
+        root_search = self.root_pattern.search if self.root_pattern else None
+        text_len = len(text)
+        state = 0
+        end_index = 0
+        while end_index < text_len:
+            if state == 0 and root_search is not None:
+                # At the root only a fragment's first character can move the
+                # automaton, so jump straight to the next one
+                match = root_search(text, end_index)
+                if match is None:
+                    return
+                end_index = match.start()
+            char = text[end_index]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for fragment in output[state]:
+                yield end_index, fragment
+            end_index += 1
+
+def literal_anchor(pattern: str) -> Tuple[str, int, bool]:
+    """
+    First literal fragment of a pattern, its offset in the pattern, and
+    whether an 'x' comes before it.
+
+    e.g. "เxือf" -> ("เ", 0, False), "xาย" -> ("าย", 1, True). An 'x' can
+    absorb a following tone mark, so a fragment after one may sit one
+    position further right in the text than its offset suggests.
+    """
+    for offset, char in enumerate(pattern):
+        if char not in 'xf':
+            end = offset
+            while end < len(pattern) and pattern[end] not in 'xf':
+                end += 1
+            return pattern[offset:end], offset, 'x' in pattern[:offset]
+    return '', 0, False
+
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Shared Thai character sets
+Module-level frozensets so scripts and detectors reuse one copy instead of
+rebuilding set literals per import or per instance.
+"""
+
+# All 44 Thai consonants (including อ, ว, and ย)
+CONSONANTS = frozenset({
+    'ก', 'ข', 'ฃ', 'ค', 'ฅ', 'ฆ', 'ง', 'จ', 'ฉ', 'ช', 'ซ', 'ฌ', 'ญ',
+    'ฎ', 'ฏ', 'ฐ', 'ฑ', 'ฒ', 'ณ', 'ด', 'ต', 'ถ', 'ท', 'ธ', 'น', 'บ',
+    'ป', 'ผ', 'ฝ', 'พ', 'ฟ', 'ภ', 'ม', 'ย', 'ร', 'ล', 'ว', 'ศ', 'ษ',
+    'ส', 'ห', 'ฬ', 'อ', 'ฮ'
+})
+
+# Vowel marks (สระ components written around the foundation)
+VOWEL_MARKS = frozenset({
+    'ะ', 'ั', 'า', 'ำ', 'ิ', 'ี', 'ึ', 'ื', 'ุ', 'ู',
+    'เ', 'แ', 'โ', 'ใ', 'ไ', '็'
+})
+
+# Tone marks (ยุกต์)
+TONE_MARKS = frozenset({'่', '้', '๊', '๋'})
+
+# Cancellation mark (การันต์)
+THANTHAKHAT = '์'
+
+# Vowel and tone marks together - neither can stand in for 'x' or 'f'
+VOWEL_AND_TONE_MARKS = VOWEL_MARKS | TONE_MARKS
+
+# Can be consonant or vowel component
+AMBIGUOUS_CHARS = frozenset({'ว', 'ย', 'อ', 'ร'})
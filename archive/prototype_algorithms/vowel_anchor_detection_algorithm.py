@@ -8,16 +8,25 @@ as anchors for syllable segmentation.
 """
 
 import json
+import re
+from array import array
 import sys
 import io
 from typing import List, Dict, Tuple, Set, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import defaultdict
 
+from thai_charsets import VOWEL_AND_TONE_MARKS, AMBIGUOUS_CHARS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Set UTF-8 encoding for output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-@dataclass
+@dataclass(slots=True)
 class VowelAnchor:
     """Represents a detected vowel pattern in text"""
     pattern: str           # The vowel pattern (e.g., "xา", "เx็f")
@@ -28,7 +37,7 @@ class VowelAnchor:
     final_pos: Optional[int] = None  # Position where final ('f') should be if present
     confidence: float = 1.0  # Confidence score for ambiguous cases
 
-@dataclass
+@dataclass(slots=True)
 class PatternInfo:
     """Metadata for a vowel pattern"""
     pattern: str
@@ -37,27 +46,159 @@ class PatternInfo:
     length: str
     openness: str
     priority: int  # For resolving conflicts (longer patterns have higher priority)
+    x_index: int   # Offset of the foundation 'x' in pattern, -1 if absent
+    f_index: int   # Offset of the final 'f' in pattern, -1 if absent
+    plen: int      # len(pattern)
+    start_offsets: Tuple[int, ...]  # Distinct (pos - start_pos) for the start/foundation/end alignments
+
+@dataclass(slots=True)
+class AnchorArrays:
+    """
+    Detected anchors stored column-wise (struct of arrays).
+
+    Positions are C ints in array.array columns; a missing foundation or
+    final position is stored as -1.
+    """
+    pattern_infos: List[PatternInfo] = field(default_factory=list)
+    start: array = field(default_factory=lambda: array('i'))
+    end: array = field(default_factory=lambda: array('i'))
+    foundation: array = field(default_factory=lambda: array('i'))
+    final: array = field(default_factory=lambda: array('i'))
+    confidence: array = field(default_factory=lambda: array('d'))
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def append(self, anchor: VowelAnchor, pattern_info: PatternInfo):
+        """Append one anchor as a row across all columns"""
+        self.pattern_infos.append(pattern_info)
+        self.start.append(anchor.start_pos)
+        self.end.append(anchor.end_pos)
+        self.foundation.append(-1 if anchor.foundation_pos is None else anchor.foundation_pos)
+        self.final.append(-1 if anchor.final_pos is None else anchor.final_pos)
+        self.confidence.append(anchor.confidence)
+
+    def sorted_by_start(self) -> 'AnchorArrays':
+        """Return a copy with rows stably ordered by start position"""
+        order = sorted(range(len(self.start)), key=self.start.__getitem__)
+        return AnchorArrays(
+            pattern_infos=[self.pattern_infos[i] for i in order],
+            start=array('i', (self.start[i] for i in order)),
+            end=array('i', (self.end[i] for i in order)),
+            foundation=array('i', (self.foundation[i] for i in order)),
+            final=array('i', (self.final[i] for i in order)),
+            confidence=array('d', (self.confidence[i] for i in order))
+        )
+
+    def as_list(self) -> List[VowelAnchor]:
+        """Materialize the rows as VowelAnchor objects"""
+        return [
+            VowelAnchor(
+                pattern=pattern_info.pattern,
+                pattern_id=pattern_info.pattern_id,
+                start_pos=start_pos,
+                end_pos=end_pos,
+                foundation_pos=None if foundation_pos < 0 else foundation_pos,
+                final_pos=None if final_pos < 0 else final_pos,
+                confidence=confidence
+            )
+            for pattern_info, start_pos, end_pos, foundation_pos, final_pos, confidence
+            in zip(self.pattern_infos, self.start, self.end,
+                   self.foundation, self.final, self.confidence)
+        ]
+
+def _alignment_offsets(pattern: str) -> Tuple[int, ...]:
+    """
+    Offsets from the trigger position back to the pattern start for the
+    'start', 'foundation' and 'end' alignments, with duplicates removed.
+
+    When 'x' opens or closes the pattern, or the pattern is one character
+    long, two alignments land on the same start position and would repeat
+    the identical match attempt.
+    """
+    offsets = [0]                              # Pattern starts at position
+    if 'x' in pattern:
+        offsets.append(pattern.index('x'))     # Pattern's 'x' at position
+    offsets.append(len(pattern) - 1)           # Pattern ends at position
+    return tuple(dict.fromkeys(offsets))
+
+def _compile_pattern_regex(pattern: str, vowel_marks: Set[str]) -> re.Pattern:
+    """
+    Compile a vowel pattern into a regex: 'x'/'f' placeholders become a
+    "not a vowel mark" character class, literals match themselves.
+    """
+    non_vowel = '[^' + ''.join(re.escape(c) for c in sorted(vowel_marks)) + ']'
+    return re.compile(''.join(non_vowel if c in 'xf' else re.escape(c) for c in pattern))
+
+def _match_pattern_at(text: str, start_pos: int, pattern_info: PatternInfo,
+                      pattern_regex: re.Pattern) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Match kernel: compare one pattern against text starting at start_pos.
+
+    The character-by-character comparison runs inside the C regex engine.
+    Every pattern character consumes exactly one text character, so the
+    placeholder positions follow directly from their offsets in the pattern.
+
+    Returns (foundation_pos, final_pos) or None. The matched positions are
+    the contiguous span start_pos .. start_pos + plen - 1.
+    """
+    if pattern_regex.match(text, start_pos) is None:
+        return None
+
+    x_index = pattern_info.x_index
+    f_index = pattern_info.f_index
+    foundation_pos = start_pos + x_index if x_index >= 0 else None
+    final_pos = start_pos + f_index if f_index >= 0 else None
+
+    return foundation_pos, final_pos
 
 class VowelAnchorDetector:
     """Detects vowel patterns in Thai text using pattern matching"""
 
     def __init__(self, vowel_patterns_file: str):
         """Initialize with vowel pattern data"""
-        with open(vowel_patterns_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Build character sets for quick filtering
+        self.vowel_marks = VOWEL_AND_TONE_MARKS
+        self.ambiguous_chars = AMBIGUOUS_CHARS  # Can be consonant or vowel component
+
+        (self.patterns, self.pattern_by_id, self.sorted_patterns,
+         self.pattern_fragments, self.pattern_regexes) = self._build_registry(vowel_patterns_file)
+
+        print(f"Loaded {len(self.patterns)} vowel patterns")
+        print(f"Unique pattern IDs: {len(set(p.pattern_id for p in self.patterns.values()))}")
+
+    def _build_registry(self, vowel_patterns_file: str) -> Tuple:
+        """Parse the pattern JSON and build the lookup tables used for matching"""
+        with open(vowel_patterns_file, 'rb') as f:
+            data = orjson.loads(f.read()) if orjson is not None else json.load(f)
 
         # Build pattern registry with IDs
-        self.patterns = {}
-        self.pattern_by_id = {}
+        patterns = {}
+        pattern_by_id = {}
         id_counts = defaultdict(int)
 
         for pattern, info in data['patterns'].items():
-            tags = info.get('tags', [])
-
-            # Extract components for ID
-            sound = next((t.replace('sound_', '') for t in tags if t.startswith('sound_')), 'X')
-            length = next((t.replace('length_', '')[0] for t in tags if t.startswith('length_')), 'X')
-            openness = next((t.replace('vowel_', '')[0] for t in tags if t.startswith('vowel_')), 'X')
+            tags = info.get('tags', ())
+
+            # Extract components for ID in a single pass over the tags
+            # (first matching tag of each kind wins)
+            sound = length = openness = None
+            for tag in tags:
+                if tag.startswith('sound_'):
+                    if sound is None:
+                        sound = tag[6:]
+                elif tag.startswith('length_'):
+                    if length is None:
+                        length = tag[7:8]
+                elif tag.startswith('vowel_'):
+                    if openness is None:
+                        openness = tag[6:7]
+            if sound is None:
+                sound = 'X'
+            if length is None:
+                length = 'X'
+            if openness is None:
+                openness = 'X'
 
             # Build base ID
             base_id = f"{sound}_{length}_{openness}"
@@ -77,203 +218,174 @@ class VowelAnchorDetector:
                 sound=sound,
                 length=length,
                 openness=openness,
-                priority=len(pattern)  # Longer patterns get higher priority
+                priority=len(pattern),  # Longer patterns get higher priority
+                x_index=pattern.find('x'),
+                f_index=pattern.find('f'),
+                plen=len(pattern),
+                start_offsets=_alignment_offsets(pattern)
             )
 
-            self.patterns[pattern] = pattern_info
-            self.pattern_by_id[pattern_id] = pattern_info
-
-        # Build character sets for quick filtering
-        self.vowel_marks = {'ะ', 'ั', 'า', 'ำ', 'ิ', 'ี', 'ึ', 'ื', 'ุ', 'ู',
-                           'เ', 'แ', 'โ', 'ใ', 'ไ', '็', '่', '้', '๊', '๋'}
-        self.ambiguous_chars = {'ว', 'ย', 'อ', 'ร'}  # Can be consonant or vowel component
+            patterns[pattern] = pattern_info
+            pattern_by_id[pattern_id] = pattern_info
 
         # Sort patterns by priority (longest first) for matching
-        self.sorted_patterns = sorted(self.patterns.values(),
-                                     key=lambda p: p.priority,
-                                     reverse=True)
+        sorted_patterns = sorted(patterns.values(),
+                                 key=lambda p: p.priority,
+                                 reverse=True)
+
+        # Literal skeleton of each pattern: the fixed substrings between the
+        # 'x'/'f' placeholders (e.g. "เx็f" -> ("เ", "็")). A pattern can only
+        # match a text that contains every one of its fragments.
+        pattern_fragments = {
+            p.pattern: tuple(frag for frag in re.split('[xf]', p.pattern) if frag)
+            for p in sorted_patterns
+        }
 
-        print(f"Loaded {len(self.patterns)} vowel patterns")
-        print(f"Unique pattern IDs: {len(set(p.pattern_id for p in self.patterns.values()))}")
+        # Compiled once here so matching never re-interprets the pattern text
+        pattern_regexes = {
+            p.pattern: _compile_pattern_regex(p.pattern, self.vowel_marks)
+            for p in sorted_patterns
+        }
+
+        return patterns, pattern_by_id, sorted_patterns, pattern_fragments, pattern_regexes
 
-    def detect_vowel_anchors(self, text: str) -> List[VowelAnchor]:
+    def detect_vowel_anchors(self, text: str) -> AnchorArrays:
         """
         Detect all vowel patterns in Thai text.
-        Returns list of VowelAnchor objects sorted by position.
+        Returns AnchorArrays sorted by position (use .as_list() for
+        VowelAnchor objects).
         """
-        anchors = []
+        anchors = AnchorArrays()
         text_len = len(text)
-        used_positions = set()
-
-        # Scan through text
-        for i in range(text_len):
-            # Quick check: is there a potential vowel component here?
-            if not self._has_vowel_potential(text, i):
-                continue
+        used_positions = bytearray(text_len)  # 1 = position claimed by an anchor
+        candidate_patterns = self._candidate_patterns(text)
+        vowel_potential = self._vowel_potential_mask(text)
 
+        # Scan through text, visiting only positions with a potential vowel component
+        i = vowel_potential.find(1)
+        while i != -1:
             # Try to match patterns at this position
-            matches = self._find_pattern_matches_at_position(text, i, used_positions)
+            best_match = self._find_best_match_at_position(text, i, used_positions,
+                                                            candidate_patterns)
 
             # Add best match if found
-            if matches:
-                best_match = matches[0]  # Already sorted by priority
-                anchors.append(best_match)
+            if best_match is not None:
+                anchors.append(best_match, self.patterns[best_match.pattern])
 
                 # Mark positions as used
                 for pos in range(best_match.start_pos, best_match.end_pos + 1):
-                    used_positions.add(pos)
+                    used_positions[pos] = 1
                 if best_match.foundation_pos is not None:
-                    used_positions.add(best_match.foundation_pos)
+                    used_positions[best_match.foundation_pos] = 1
                 if best_match.final_pos is not None:
-                    used_positions.add(best_match.final_pos)
-
-        # Sort anchors by position
-        anchors.sort(key=lambda a: a.start_pos)
-
-        return anchors
-
-    def _has_vowel_potential(self, text: str, pos: int) -> bool:
-        """Check if position could be part of a vowel pattern"""
-        if pos >= len(text):
-            return False
+                    used_positions[best_match.final_pos] = 1
 
-        char = text[pos]
+            i = vowel_potential.find(1, i + 1)
 
-        # Explicit vowel mark
-        if char in self.vowel_marks:
-            return True
-
-        # Ambiguous character that might be part of vowel
-        if char in self.ambiguous_chars:
-            # Check context to determine if likely vowel component
-            return self._check_ambiguous_context(text, pos)
-
-        return False
-
-    def _check_ambiguous_context(self, text: str, pos: int) -> bool:
-        """Check if ambiguous character is likely part of vowel pattern"""
-        char = text[pos]
-
-        # Simple heuristics for now
-        if char == 'ว':
-            # Check if preceded by consonant (likely vowel)
-            if pos > 0 and text[pos-1] not in self.vowel_marks:
-                return True
-
-        if char == 'ย':
-            # Check if at end or followed by space/punctuation (likely final)
-            if pos == len(text) - 1 or (pos < len(text) - 1 and text[pos+1] in ' .,!?'):
-                return True
-
-        if char == 'อ':
-            # Check if followed by vowel mark (likely part of pattern)
-            if pos < len(text) - 1 and text[pos+1] in self.vowel_marks:
-                return True
-
-        return False
-
-    def _find_pattern_matches_at_position(self, text: str, pos: int,
-                                         used: Set[int]) -> List[VowelAnchor]:
-        """Find all patterns that could match at or near this position"""
-        matches = []
-
-        for pattern_info in self.sorted_patterns:
-            pattern = pattern_info.pattern
+        # Sort anchors by position
+        return anchors.sorted_by_start()
 
-            # Try different alignment strategies
-            # Strategy 1: Pattern starts at current position
-            anchor = self._try_match_pattern(text, pos, pattern_info, used, 'start')
-            if anchor:
-                matches.append(anchor)
+    def _candidate_patterns(self, text: str) -> List[PatternInfo]:
+        """
+        Patterns whose literal fragments all occur somewhere in text.
 
-            # Strategy 2: Pattern's 'x' aligns with current position
-            if 'x' in pattern:
-                anchor = self._try_match_pattern(text, pos, pattern_info, used, 'foundation')
-                if anchor:
-                    matches.append(anchor)
+        Each fragment test is a C-level substring search over the whole text,
+        so patterns that cannot match are dropped once per text instead of
+        being retried at every position. Priority order is preserved.
+        """
+        return [pattern_info for pattern_info in self.sorted_patterns
+                if all(frag in text for frag in self.pattern_fragments[pattern_info.pattern])]
 
-            # Strategy 3: Pattern ends at current position
-            anchor = self._try_match_pattern(text, pos, pattern_info, used, 'end')
-            if anchor:
-                matches.append(anchor)
+    def _vowel_potential_mask(self, text: str) -> bytearray:
+        """
+        Flag every position that could be part of a vowel pattern.
 
-        # Sort by confidence and priority
-        matches.sort(key=lambda m: (m.confidence, self.patterns[m.pattern].priority),
-                    reverse=True)
+        Vowel-mark and punctuation flags are computed for the whole text up
+        front, so the ambiguous-character heuristics are plain index lookups
+        instead of set membership tests inside the scan.
+        """
+        text_len = len(text)
+        vowel_marks = self.vowel_marks
+        is_vowel = bytearray(c in vowel_marks for c in text)
+        is_punct = bytearray(c in ' .,!?' for c in text)
+        potential = bytearray(is_vowel)  # Explicit vowel marks always qualify
+
+        # Ambiguous characters that might be part of a vowel, judged by context
+        for pos, char in enumerate(text):
+            if char not in self.ambiguous_chars:
+                continue
 
-        return matches
+            if char == 'ว':
+                # Preceded by consonant (likely vowel)
+                potential[pos] = pos > 0 and not is_vowel[pos-1]
+            elif char == 'ย':
+                # At end or followed by space/punctuation (likely final)
+                potential[pos] = pos == text_len - 1 or is_punct[pos+1]
+            elif char == 'อ':
+                # Followed by vowel mark (likely part of pattern)
+                potential[pos] = pos < text_len - 1 and is_vowel[pos+1]
+
+        return potential
+
+    def _find_best_match_at_position(self, text: str, pos: int,
+                                     used: bytearray,
+                                     candidate_patterns: List[PatternInfo]) -> Optional[VowelAnchor]:
+        """
+        Find the best pattern match at or near this position.
 
-    def _try_match_pattern(self, text: str, pos: int, pattern_info: PatternInfo,
-                           used: Set[int], alignment: str) -> Optional[VowelAnchor]:
-        """Try to match a pattern with specific alignment"""
+        Keeps a running maximum by (confidence, priority) instead of sorting
+        every match; on ties the first match found wins.
+        """
+        best_match = None
+        best_key = None
+
+        for pattern_info in candidate_patterns:
+            # candidate_patterns is in descending priority order, so once a
+            # full-confidence match is held no lower-priority pattern can win
+            if best_key is not None and best_key[0] >= 1.0 and pattern_info.priority < best_key[1]:
+                break
+
+            # Try each distinct alignment of the pattern against this position
+            for offset in pattern_info.start_offsets:
+                anchor = self._try_match_pattern(text, pos - offset, pattern_info, used)
+                if anchor is None:
+                    continue
+
+                key = (anchor.confidence, pattern_info.priority)
+                if best_key is None or key > best_key:
+                    best_match = anchor
+                    best_key = key
+
+        return best_match
+
+    def _try_match_pattern(self, text: str, start_pos: int, pattern_info: PatternInfo,
+                           used: bytearray) -> Optional[VowelAnchor]:
+        """Try to match a pattern starting at start_pos"""
         pattern = pattern_info.pattern
 
-        # Calculate starting position based on alignment
-        if alignment == 'start':
-            start_pos = pos
-        elif alignment == 'foundation':
-            # Find where pattern starts if 'x' is at pos
-            x_index = pattern.index('x') if 'x' in pattern else 0
-            start_pos = pos - x_index
-        elif alignment == 'end':
-            start_pos = pos - len(pattern) + 1
-        else:
-            return None
+        end_pos = start_pos + pattern_info.plen - 1
 
         # Check bounds
-        if start_pos < 0 or start_pos + len(pattern) > len(text):
+        if start_pos < 0 or end_pos >= len(text):
             return None
 
-        # Try to match pattern
-        foundation_pos = None
-        final_pos = None
-        matched_positions = []
-
-        pattern_idx = 0
-        text_idx = start_pos
-
-        while pattern_idx < len(pattern):
-            p_char = pattern[pattern_idx]
-
-            if p_char == 'x':
-                # Foundation placeholder - skip consonant(s)
-                foundation_pos = text_idx
-                # For now, assume single consonant
-                if text_idx < len(text) and text[text_idx] not in self.vowel_marks:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                else:
-                    return None
-
-            elif p_char == 'f':
-                # Final consonant placeholder
-                final_pos = text_idx
-                if text_idx < len(text) and text[text_idx] not in self.vowel_marks:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                else:
-                    return None
-
-            else:
-                # Must match exact character
-                if text_idx < len(text) and text[text_idx] == p_char:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                else:
-                    return None
-
-            pattern_idx += 1
+        # Fail fast if any position in the span is already used
+        # (bytearray.find scans the span in C without building a list)
+        if used.find(1, start_pos, end_pos + 1) != -1:
+            return None
 
-        # Check if any positions are already used
-        if any(pos in used for pos in matched_positions):
+        # Try to match pattern
+        match = _match_pattern_at(text, start_pos, pattern_info, self.pattern_regexes[pattern])
+        if match is None:
             return None
+        foundation_pos, final_pos = match
 
         # Create anchor
         return VowelAnchor(
             pattern=pattern,
             pattern_id=pattern_info.pattern_id,
-            start_pos=min(matched_positions) if matched_positions else start_pos,
-            end_pos=max(matched_positions) if matched_positions else start_pos,
+            start_pos=start_pos,
+            end_pos=end_pos,
             foundation_pos=foundation_pos,
             final_pos=final_pos,
             confidence=1.0  # Can be adjusted based on context
@@ -294,30 +406,31 @@ class VowelAnchorDetector:
             'coverage': 0.0
         }
 
-        covered_positions = set()
+        covered_positions = bytearray(len(text))
 
-        for anchor in anchors:
+        for pattern_info, start_pos, end_pos, foundation_pos, final_pos in zip(
+                anchors.pattern_infos, anchors.start, anchors.end,
+                anchors.foundation, anchors.final):
             anchor_info = {
-                'pattern': anchor.pattern,
-                'pattern_id': anchor.pattern_id,
-                'positions': f"[{anchor.start_pos}-{anchor.end_pos}]",
-                'text_segment': text[anchor.start_pos:anchor.end_pos+1] if anchor.end_pos < len(text) else text[anchor.start_pos:],
-                'foundation_at': anchor.foundation_pos,
-                'final_at': anchor.final_pos
+                'pattern': pattern_info.pattern,
+                'pattern_id': pattern_info.pattern_id,
+                'positions': f"[{start_pos}-{end_pos}]",
+                'text_segment': text[start_pos:end_pos+1] if end_pos < len(text) else text[start_pos:],
+                'foundation_at': None if foundation_pos < 0 else foundation_pos,
+                'final_at': None if final_pos < 0 else final_pos
             }
             analysis['anchors'].append(anchor_info)
 
-            # Track coverage
-            for pos in range(anchor.start_pos, anchor.end_pos + 1):
-                covered_positions.add(pos)
-            if anchor.foundation_pos is not None:
-                covered_positions.add(anchor.foundation_pos)
-            if anchor.final_pos is not None:
-                covered_positions.add(anchor.final_pos)
+            # Track coverage (slice assignment marks the whole span at once)
+            covered_positions[start_pos:end_pos + 1] = b'\x01' * (end_pos + 1 - start_pos)
+            if foundation_pos >= 0:
+                covered_positions[foundation_pos] = 1
+            if final_pos >= 0:
+                covered_positions[final_pos] = 1
 
         # Calculate coverage
         if len(text) > 0:
-            analysis['coverage'] = len(covered_positions) / len(text)
+            analysis['coverage'] = covered_positions.count(1) / len(text)
 
         return analysis
 
@@ -6,16 +6,52 @@ Based on Voraritskul Conjecture for Thai Segmentation
 """
 
 import json
+import re
+from array import array
+from bisect import bisect_right
 import sys
 import io
 from typing import List, Dict, Tuple, Set, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import defaultdict
 
-# Set UTF-8 encoding for output
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+from fragment_automaton import FragmentAutomaton
 
-@dataclass
+# Character class bits for the Thai block (U+0E00-U+0E7F) lookup table
+THAI_BLOCK_START = 0x0E00
+THAI_BLOCK_SIZE = 128
+BIT_VOWEL = 1
+BIT_TONE = 2
+
+# Small-int character codes: Thai code points map to their offset in the
+# block, anything else to CODE_OTHER; pattern placeholders get negative codes
+CODE_OTHER = THAI_BLOCK_SIZE
+CODE_X = -1
+CODE_F = -2
+
+# Tie-break order between alignments of the same pattern
+ALIGNMENT_ORDER = {'start': 0, 'foundation': 1, 'end': 2}
+
+class _CodeTable(dict):
+    """str.translate table: Thai chars to chr(offset), others to chr(CODE_OTHER)"""
+    def __missing__(self, codepoint):
+        if THAI_BLOCK_START <= codepoint < THAI_BLOCK_START + THAI_BLOCK_SIZE:
+            return chr(codepoint - THAI_BLOCK_START)
+        return chr(CODE_OTHER)
+
+_CODE_TABLE = _CodeTable()
+
+def _encode_text(text: str) -> bytes:
+    """Encode text as one small-int code per character (C-level translate + encode)"""
+    return text.translate(_CODE_TABLE).encode('latin-1')
+
+def _encode_pattern(pattern: str) -> Tuple[int, ...]:
+    """Encode a pattern with CODE_X/CODE_F for its 'x'/'f' placeholders"""
+    return tuple(CODE_X if char == 'x' else CODE_F if char == 'f'
+                 else ord(char) - THAI_BLOCK_START
+                 for char in pattern)
+
+@dataclass(slots=True, frozen=True)
 class VowelAnchor:
     """Represents a detected vowel pattern in text"""
     pattern: str           # The vowel pattern (e.g., "xา", "เx็f")
@@ -27,7 +63,7 @@ class VowelAnchor:
     final_pos: Optional[int] = None  # Position where final ('f') should be if present
     confidence: float = 1.0  # Confidence score for ambiguous cases
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PatternInfo:
     """Metadata for a vowel pattern"""
     pattern: str
@@ -39,12 +75,147 @@ class PatternInfo:
     has_jglide: bool
     has_wglide: bool
     priority: int  # For resolving conflicts (longer patterns have higher priority)
+    x_index: int = -1  # Index of the foundation placeholder 'x' (-1 if none)
+    f_index: int = -1  # Index of the final placeholder 'f' (-1 if none)
+
+@dataclass(slots=True)
+class AnchorArrays:
+    """
+    Detected anchors stored column-wise (struct of arrays).
+
+    pattern_id is a pattern's rank in the detector's sorted_patterns, which
+    is passed in as pool and only dereferenced when rows are read. Positions
+    are C ints in array.array columns; a missing foundation or final
+    position is stored as -1.
+    """
+    pool: List[PatternInfo]
+    pattern_id: array = field(default_factory=lambda: array('i'))
+    start: array = field(default_factory=lambda: array('i'))
+    end: array = field(default_factory=lambda: array('i'))
+    foundation: array = field(default_factory=lambda: array('i'))
+    final: array = field(default_factory=lambda: array('i'))
+    confidence: array = field(default_factory=lambda: array('d'))
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def append(self, anchor: VowelAnchor, pattern_id: int):
+        """Append one anchor as a row across all columns"""
+        self.pattern_id.append(pattern_id)
+        self.start.append(anchor.start_pos)
+        self.end.append(anchor.end_pos)
+        self.foundation.append(-1 if anchor.foundation_pos is None else anchor.foundation_pos)
+        self.final.append(-1 if anchor.final_pos is None else anchor.final_pos)
+        self.confidence.append(anchor.confidence)
+
+    def sorted_by_start(self) -> 'AnchorArrays':
+        """Return a copy with rows stably ordered by start position"""
+        order = sorted(range(len(self.start)), key=self.start.__getitem__)
+        return AnchorArrays(
+            pool=self.pool,
+            pattern_id=array('i', (self.pattern_id[i] for i in order)),
+            start=array('i', (self.start[i] for i in order)),
+            end=array('i', (self.end[i] for i in order)),
+            foundation=array('i', (self.foundation[i] for i in order)),
+            final=array('i', (self.final[i] for i in order)),
+            confidence=array('d', (self.confidence[i] for i in order))
+        )
+
+    def as_list(self) -> List[VowelAnchor]:
+        """Materialize the rows as VowelAnchor objects"""
+        anchors = []
+        for pattern_id, start_pos, end_pos, foundation_pos, final_pos, confidence in zip(
+                self.pattern_id, self.start, self.end,
+                self.foundation, self.final, self.confidence):
+            pattern_info = self.pool[pattern_id]
+            anchors.append(VowelAnchor(
+                pattern=pattern_info.pattern,
+                abbrev_id=pattern_info.abbrev_id,
+                long_id=pattern_info.long_id,
+                start_pos=start_pos,
+                end_pos=end_pos,
+                foundation_pos=None if foundation_pos < 0 else foundation_pos,
+                final_pos=None if final_pos < 0 else final_pos,
+                confidence=confidence
+            ))
+        return anchors
+
+def _compile_start_regex(pattern: str, vowel_marks: Set[str],
+                         tone_marks: Set[str]) -> re.Pattern:
+    """
+    Compile pattern to a zero-width regex whose matches are exactly the start
+    positions where _match_pattern_kernel would accept it (ignoring used
+    positions): 'x' is a non-vowel optionally followed by one tone mark that
+    is always taken when present, 'f' is a non-vowel.
+    """
+    vowel_class = '[' + ''.join(re.escape(c) for c in sorted(vowel_marks)) + ']'
+    tone_class = '[' + ''.join(re.escape(c) for c in sorted(tone_marks)) + ']'
+    parts = []
+    for char in pattern:
+        if char == 'x':
+            # (?:tone|(?!tone)) never backtracks over the tone mark
+            parts.append(f'(?!{vowel_class})[\\s\\S](?:{tone_class}|(?!{tone_class}))')
+        elif char == 'f':
+            parts.append(f'(?!{vowel_class})[\\s\\S]')
+        else:
+            parts.append(re.escape(char))
+    return re.compile('(?=' + ''.join(parts) + ')')
+
+def _match_pattern_kernel(text_codes: bytes, start_pos: int, pattern_codes: Tuple[int, ...],
+                          cclass: bytearray):
+    """
+    Walk pattern_codes over text_codes from start_pos.
+
+    Both sides are small ints (see _encode_text and _encode_pattern) and
+    character classes come from the cclass bitmap, so every step is an
+    int compare or a table load rather than a str comparison or set lookup.
+    Returns (foundation_pos, final_pos, matched_positions), or None if the
+    pattern does not match here.
+    """
+    text_len = len(text_codes)
+    foundation_pos = None
+    final_pos = None
+    matched_positions = []
+    text_idx = start_pos
+
+    for p_code in pattern_codes:
+        if text_idx >= text_len:
+            return None
+        code = text_codes[text_idx]
+
+        if p_code == CODE_X:
+            # Foundation placeholder - single consonant, optionally followed
+            # by a tone mark that is skipped but not added to matched positions
+            if cclass[code] & BIT_VOWEL:
+                return None
+            foundation_pos = text_idx
+            matched_positions.append(text_idx)
+            text_idx += 1
+            if text_idx < text_len and cclass[text_codes[text_idx]] & BIT_TONE:
+                text_idx += 1
+
+        elif p_code == CODE_F:
+            # Final consonant placeholder
+            if cclass[code] & BIT_VOWEL:
+                return None
+            final_pos = text_idx
+            matched_positions.append(text_idx)
+            text_idx += 1
+
+        else:
+            # Must match exact character
+            if code != p_code:
+                return None
+            matched_positions.append(text_idx)
+            text_idx += 1
+
+    return foundation_pos, final_pos, matched_positions
 
 class VowelAnchorDetectorV2:
     """Detects vowel patterns in Thai text using enhanced ID system"""
 
-    def __init__(self, vowel_patterns_file: str):
-        """Initialize with vowel pattern data"""
+    def __init__(self, vowel_patterns_file: str, verbose: bool = False):
+        """Initialize with vowel pattern data (verbose prints registry stats)"""
         with open(vowel_patterns_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
@@ -109,7 +280,9 @@ class VowelAnchorDetectorV2:
                 openness=openness,
                 has_jglide=has_jglide,
                 has_wglide=has_wglide,
-                priority=len(pattern)  # Longer patterns get higher priority
+                priority=len(pattern),  # Longer patterns get higher priority
+                x_index=pattern.find('x'),
+                f_index=pattern.find('f')
             )
 
             self.patterns[pattern] = pattern_info
@@ -122,133 +295,210 @@ class VowelAnchorDetectorV2:
         self.ambiguous_chars = {'ว', 'ย', 'อ', 'ร'}  # Can be consonant or vowel component
         self.tone_marks = {'่', '้', '๊', '๋'}
 
+        # One byte of class bits per Thai code point, so classifying a
+        # character is a bounds check and a table load instead of set lookups
+        self._cclass = bytearray(THAI_BLOCK_SIZE + 1)  # last slot: CODE_OTHER
+        for bit, chars in ((BIT_VOWEL, self.vowel_marks),
+                           (BIT_TONE, self.tone_marks)):
+            for char in chars:
+                self._cclass[ord(char) - THAI_BLOCK_START] |= bit
+
+        # Positions that could be part of a vowel pattern, as one regex over
+        # the whole text: explicit vowel marks (tone marks excluded), plus
+        # lookaround heuristics for when an ambiguous character is likely a
+        # vowel component
+        vowels = ''.join(re.escape(c) for c in sorted(self.vowel_marks))
+        primary = ''.join(re.escape(c) for c in sorted(self.vowel_marks - self.tone_marks))
+        self._potential_re = re.compile('|'.join([
+            f'[{primary}]',
+            f'(?<=[^{vowels}])ว',          # ว after a consonant
+            '(?<=[\\s\\S]ั)ว',              # xัว
+            'ย(?=[ .,!?]|\\Z)',             # final ย
+            '(?<=[\\s\\S][าั])ย',           # xาย, xัย
+            f'อ(?=[{vowels}])',            # อ before a vowel mark
+            '(?<=เ)อ',                     # เอ
+        ]))
+
         # Sort patterns by priority (longest first) for matching
         self.sorted_patterns = sorted(self.patterns.values(),
                                      key=lambda p: p.priority,
                                      reverse=True)
 
-        print(f"Loaded {len(self.patterns)} vowel patterns")
-        print(f"Unique abbreviated IDs: {len(set(p.abbrev_id for p in self.patterns.values()))}")
-        print(f"Unique long IDs: {len(set(p.long_id for p in self.patterns.values()))}")
+        # Scratch buffer for detect_vowel_anchors' claimed-position flags,
+        # grown as needed and reused across calls (not shared between threads)
+        self._used_scratch = bytearray()
+
+        # The matching data below is held in columns indexed by a pattern's
+        # rank in sorted_patterns, so the scan works with plain ints and
+        # list indexing rather than per-pattern dict lookups
+        self.pattern_index = {p.pattern: rank for rank, p in enumerate(self.sorted_patterns)}
+
+        # Patterns as small-int codes for _match_pattern_kernel
+        self._pattern_codes = [_encode_pattern(p.pattern) for p in self.sorted_patterns]
+
+        # Literal fragments between the 'x'/'f' placeholders of each pattern
+        # (e.g. "เx็f" -> ("เ", "็")), indexed by one automaton. A pattern can
+        # only match a text in which all of its fragments occur.
+        self.pattern_fragments = [
+            tuple(frag for frag in re.split('[xf]', p.pattern) if frag)
+            for p in self.sorted_patterns
+        ]
+        self.fragment_automaton = FragmentAutomaton(
+            {frag for frags in self.pattern_fragments for frag in frags}
+        )
 
-    def detect_vowel_anchors(self, text: str) -> List[VowelAnchor]:
+        # Per-pattern regexes giving every position a pattern can start at,
+        # found by the C regex engine in one pass over the text
+        self.start_regexes = [
+            _compile_start_regex(p.pattern, self.vowel_marks, self.tone_marks)
+            for p in self.sorted_patterns
+        ]
+
+        # Every alignment puts the pattern's first character at a known text
+        # position, so group patterns by alignment, by the offset of that
+        # start position from the vowel position, and by first character
+        # ('x' for placeholder-led patterns). Entries are pattern ranks, which
+        # also let ties resolve as in a full scan.
+        # An alignment that lands on the same start position as an earlier
+        # one (x first or last, or a one-character pattern) would only repeat
+        # that probe, so it is left out.
+        buckets = defaultdict(lambda: defaultdict(list))
+        for rank, p in enumerate(self.sorted_patterns):
+            last_index = len(p.pattern) - 1
+            buckets[('start', 0)][p.pattern[0]].append(rank)
+            if 0 < p.x_index < last_index:
+                buckets[('foundation', p.x_index)][p.pattern[0]].append(rank)
+            if last_index > 0:
+                buckets[('end', last_index)][p.pattern[0]].append(rank)
+        self.alignment_buckets = [
+            (alignment, offset, dict(by_char))
+            for (alignment, offset), by_char in buckets.items()
+        ]
+
+        if verbose:
+            print(f"Loaded {len(self.patterns)} vowel patterns")
+            print(f"Unique abbreviated IDs: {len(set(p.abbrev_id for p in self.patterns.values()))}")
+            print(f"Unique long IDs: {len(set(p.long_id for p in self.patterns.values()))}")
+
+    def detect_vowel_anchors(self, text: str) -> AnchorArrays:
         """
         Detect all vowel patterns in Thai text.
-        Returns list of VowelAnchor objects sorted by position.
+        Returns the anchors column-wise, sorted by position
+        (use .as_list() for VowelAnchor objects).
         """
-        anchors = []
+        anchors = AnchorArrays(pool=self.sorted_patterns)
         text_len = len(text)
-        used_positions = set()
-
-        # Scan through text
-        for i in range(text_len):
-            # Quick check: is there a potential vowel component here?
-            if not self._has_vowel_potential(text, i):
+        # 1 = position already claimed; reuses the instance scratch buffer
+        if len(self._used_scratch) < text_len:
+            self._used_scratch.extend(bytes(text_len - len(self._used_scratch)))
+        used_positions = self._used_scratch
+        used_positions[:text_len] = bytes(text_len)
+
+        # Only patterns whose literal fragments all occur in the text can
+        # match; for those, flag every position the pattern can start at
+        found_fragments = self.fragment_automaton.find_fragments(text)
+        candidate_patterns = [None] * len(self.sorted_patterns)
+        for rank, fragments in enumerate(self.pattern_fragments):
+            if not found_fragments.issuperset(fragments):
                 continue
+            match_starts = bytearray(text_len)
+            for match in self.start_regexes[rank].finditer(text):
+                match_starts[match.start()] = 1
+            if 1 in match_starts:
+                candidate_patterns[rank] = match_starts
+
+        text_codes = _encode_text(text)
+
+        # Scan the positions that could hold a vowel component
+        positions = self._vowel_potential_positions(text)
+        idx = 0
+        while idx < len(positions):
+            i = positions[idx]
+            idx += 1
 
             # Try to match patterns at this position
-            matches = self._find_pattern_matches_at_position(text, i, used_positions)
+            matches = self._find_pattern_matches_at_position(text, text_codes, i,
+                                                            used_positions,
+                                                            candidate_patterns)
 
             # Add best match if found
             if matches:
                 best_match = matches[0]  # Already sorted by priority
-                anchors.append(best_match)
+                anchors.append(best_match, self.pattern_index[best_match.pattern])
 
                 # Mark positions as used
                 for pos in range(best_match.start_pos, best_match.end_pos + 1):
-                    used_positions.add(pos)
+                    used_positions[pos] = 1
                 if best_match.foundation_pos is not None:
-                    used_positions.add(best_match.foundation_pos)
+                    used_positions[best_match.foundation_pos] = 1
                 if best_match.final_pos is not None:
-                    used_positions.add(best_match.final_pos)
+                    used_positions[best_match.final_pos] = 1
+
+                # Every position up to the end of the match is now used, and
+                # a used position can never start a new match - skip past it
+                skip_end = max(best_match.end_pos,
+                               best_match.foundation_pos if best_match.foundation_pos is not None else -1,
+                               best_match.final_pos if best_match.final_pos is not None else -1)
+                idx = bisect_right(positions, skip_end, idx)
 
         # Sort anchors by position
-        anchors.sort(key=lambda a: a.start_pos)
+        return anchors.sorted_by_start()
 
-        return anchors
+    def _vowel_potential_positions(self, text: str) -> List[int]:
+        """
+        Positions that could be part of a vowel pattern, found in one regex
+        pass over the whole text (context checks included).
+        """
+        return [match.start() for match in self._potential_re.finditer(text)]
 
-    def _has_vowel_potential(self, text: str, pos: int) -> bool:
-        """Check if position could be part of a vowel pattern"""
-        if pos >= len(text):
-            return False
-
-        char = text[pos]
-
-        # Explicit vowel mark (excluding tone marks for primary detection)
-        if char in self.vowel_marks and char not in self.tone_marks:
-            return True
-
-        # Ambiguous character that might be part of vowel
-        if char in self.ambiguous_chars:
-            # Check context to determine if likely vowel component
-            return self._check_ambiguous_context(text, pos)
-
-        return False
-
-    def _check_ambiguous_context(self, text: str, pos: int) -> bool:
-        """Check if ambiguous character is likely part of vowel pattern"""
-        char = text[pos]
-
-        # Enhanced heuristics
-        if char == 'ว':
-            # Check if preceded by consonant (likely vowel)
-            if pos > 0 and text[pos-1] not in self.vowel_marks:
-                return True
-            # Check if part of xัว pattern
-            if pos > 1 and text[pos-1] == 'ั':
-                return True
-
-        if char == 'ย':
-            # Check if at end or followed by space/punctuation (likely final)
-            if pos == len(text) - 1 or (pos < len(text) - 1 and text[pos+1] in ' .,!?'):
-                return True
-            # Check if part of xาย, xัย patterns
-            if pos > 1 and text[pos-1] in 'าั':
-                return True
-
-        if char == 'อ':
-            # Check if followed by vowel mark (likely part of pattern)
-            if pos < len(text) - 1 and text[pos+1] in self.vowel_marks:
-                return True
-            # Check if preceded by เ (เอ pattern)
-            if pos > 0 and text[pos-1] == 'เ':
-                return True
-
-        return False
-
-    def _find_pattern_matches_at_position(self, text: str, pos: int,
-                                         used: Set[int]) -> List[VowelAnchor]:
-        """Find all patterns that could match at or near this position"""
-        matches = []
-
-        for pattern_info in self.sorted_patterns:
-            pattern = pattern_info.pattern
-
-            # Try different alignment strategies
-            # Strategy 1: Pattern starts at current position
-            anchor = self._try_match_pattern(text, pos, pattern_info, used, 'start')
-            if anchor:
-                matches.append(anchor)
-
-            # Strategy 2: Pattern's 'x' aligns with current position
-            if 'x' in pattern:
-                anchor = self._try_match_pattern(text, pos, pattern_info, used, 'foundation')
+    def _find_pattern_matches_at_position(self, text: str, text_codes: bytes, pos: int,
+                                         used: bytearray,
+                                         candidate_patterns: List[Optional[bytearray]]) -> List[VowelAnchor]:
+        """
+        Find the best pattern match at or near this position.
+        Returns a list holding the best anchor, or an empty list.
+        """
+        # Confidence is always 1.0 and sorted_patterns is in priority order,
+        # so the best match is simply the one with the lowest (rank,
+        # alignment order) - track that instead of collecting and sorting,
+        # and skip any probe that could not beat it.
+        best_key = None
+        best_anchor = None
+
+        # The foundation alignment puts 'x' on pos, which can only match a
+        # non-vowel - at an explicit vowel mark it is skipped outright
+        x_fits = text[pos] not in self.vowel_marks
+
+        for alignment, offset, by_first_char in self.alignment_buckets:
+            start_pos = pos - offset
+            if start_pos < 0 or (alignment == 'foundation' and not x_fits):
+                continue
+            order = ALIGNMENT_ORDER[alignment]
+
+            # Only patterns whose first character fits text[start_pos]
+            first_char = text[start_pos]
+            bucket = by_first_char.get(first_char, [])
+            if first_char not in self.vowel_marks:
+                bucket = bucket + by_first_char.get('x', [])
+
+            for rank in bucket:
+                if best_key is not None and (rank, order) > best_key:
+                    continue
+                match_starts = candidate_patterns[rank]
+                if match_starts is None or not match_starts[start_pos]:
+                    continue
+                anchor = self._try_match_pattern(text, text_codes, pos,
+                                                 self.sorted_patterns[rank],
+                                                 used, alignment)
                 if anchor:
-                    matches.append(anchor)
-
-            # Strategy 3: Pattern ends at current position
-            anchor = self._try_match_pattern(text, pos, pattern_info, used, 'end')
-            if anchor:
-                matches.append(anchor)
+                    best_key = (rank, order)
+                    best_anchor = anchor
 
-        # Sort by confidence and priority
-        matches.sort(key=lambda m: (m.confidence, self.patterns[m.pattern].priority),
-                    reverse=True)
+        return [best_anchor] if best_anchor else []
 
-        return matches
-
-    def _try_match_pattern(self, text: str, pos: int, pattern_info: PatternInfo,
-                           used: Set[int], alignment: str) -> Optional[VowelAnchor]:
+    def _try_match_pattern(self, text: str, text_codes: bytes, pos: int,
+                           pattern_info: PatternInfo,
+                           used: bytearray, alignment: str) -> Optional[VowelAnchor]:
         """Try to match a pattern with specific alignment"""
         pattern = pattern_info.pattern
 
@@ -257,8 +507,7 @@ class VowelAnchorDetectorV2:
             start_pos = pos
         elif alignment == 'foundation':
             # Find where pattern starts if 'x' is at pos
-            x_index = pattern.index('x') if 'x' in pattern else 0
-            start_pos = pos - x_index
+            start_pos = pos - max(pattern_info.x_index, 0)
         elif alignment == 'end':
             start_pos = pos - len(pattern) + 1
         else:
@@ -269,51 +518,17 @@ class VowelAnchorDetectorV2:
             return None
 
         # Try to match pattern
-        foundation_pos = None
-        final_pos = None
-        matched_positions = []
-
-        pattern_idx = 0
-        text_idx = start_pos
-
-        while pattern_idx < len(pattern):
-            p_char = pattern[pattern_idx]
-
-            if p_char == 'x':
-                # Foundation placeholder - skip consonant(s)
-                foundation_pos = text_idx
-                # For now, assume single consonant (can be enhanced for clusters)
-                if text_idx < len(text) and text[text_idx] not in self.vowel_marks:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                    # Check for tone mark after consonant
-                    if text_idx < len(text) and text[text_idx] in self.tone_marks:
-                        text_idx += 1  # Skip tone mark but don't add to matched positions
-                else:
-                    return None
-
-            elif p_char == 'f':
-                # Final consonant placeholder
-                final_pos = text_idx
-                if text_idx < len(text) and text[text_idx] not in self.vowel_marks:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                else:
-                    return None
-
-            else:
-                # Must match exact character
-                if text_idx < len(text) and text[text_idx] == p_char:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                else:
-                    return None
-
-            pattern_idx += 1
+        match = _match_pattern_kernel(text_codes, start_pos,
+                                      self._pattern_codes[self.pattern_index[pattern]],
+                                      self._cclass)
+        if match is None:
+            return None
+        foundation_pos, final_pos, matched_positions = match
 
         # Check if any positions are already used
-        if any(pos in used for pos in matched_positions):
-            return None
+        for matched_pos in matched_positions:
+            if used[matched_pos]:
+                return None
 
         # Create anchor with dual IDs
         return VowelAnchor(
@@ -342,21 +557,23 @@ class VowelAnchorDetectorV2:
             'coverage': 0.0
         }
 
-        covered_positions = set()
+        covered_positions = bytearray(len(text))
 
-        for anchor in anchors:
+        for pattern_id, start_pos, end_pos, foundation_pos, final_pos in zip(
+                anchors.pattern_id, anchors.start, anchors.end,
+                anchors.foundation, anchors.final):
+            pattern_info = anchors.pool[pattern_id]
             anchor_info = {
-                'pattern': anchor.pattern,
-                'abbrev_id': anchor.abbrev_id,
-                'long_id': anchor.long_id,
-                'positions': f"[{anchor.start_pos}-{anchor.end_pos}]",
-                'text_segment': text[anchor.start_pos:anchor.end_pos+1] if anchor.end_pos < len(text) else text[anchor.start_pos:],
-                'foundation_at': anchor.foundation_pos,
-                'final_at': anchor.final_pos
+                'pattern': pattern_info.pattern,
+                'abbrev_id': pattern_info.abbrev_id,
+                'long_id': pattern_info.long_id,
+                'positions': f"[{start_pos}-{end_pos}]",
+                'text_segment': text[start_pos:end_pos+1] if end_pos < len(text) else text[start_pos:],
+                'foundation_at': None if foundation_pos < 0 else foundation_pos,
+                'final_at': None if final_pos < 0 else final_pos
             }
 
             # Add glide information
-            pattern_info = self.patterns[anchor.pattern]
             if pattern_info.has_jglide:
                 anchor_info['glide'] = 'j-glide (ย)'
             elif pattern_info.has_wglide:
@@ -364,17 +581,16 @@ class VowelAnchorDetectorV2:
 
             analysis['anchors'].append(anchor_info)
 
-            # Track coverage
-            for pos in range(anchor.start_pos, anchor.end_pos + 1):
-                covered_positions.add(pos)
-            if anchor.foundation_pos is not None:
-                covered_positions.add(anchor.foundation_pos)
-            if anchor.final_pos is not None:
-                covered_positions.add(anchor.final_pos)
+            # Track coverage (slice assignment marks the whole span at once)
+            covered_positions[start_pos:end_pos + 1] = b'\x01' * (end_pos + 1 - start_pos)
+            if foundation_pos >= 0:
+                covered_positions[foundation_pos] = 1
+            if final_pos >= 0:
+                covered_positions[final_pos] = 1
 
         # Calculate coverage
         if len(text) > 0:
-            analysis['coverage'] = len(covered_positions) / len(text)
+            analysis['coverage'] = covered_positions.count(1) / len(text)
 
         return analysis
 
@@ -383,7 +599,7 @@ def main():
     """Test the enhanced vowel anchor detection algorithm"""
 
     # Initialize detector
-    detector = VowelAnchorDetectorV2("thai_vowels_tagged_9-21-2025-2-31-pm.json")
+    detector = VowelAnchorDetectorV2("thai_vowels_tagged_9-21-2025-2-31-pm.json", verbose=True)
 
     # Test cases - include some with glides
     test_cases = [
@@ -444,4 +660,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Set UTF-8 encoding for output
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     main()
\ No newline at end of file
@@ -7,15 +7,58 @@ Uses IDs stored in database with corrected format:
 """
 
 import json
+import os
+import re
 import sys
 import io
-from typing import List, Dict, Tuple, Set, Optional
+from array import array
+from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
+from collections import defaultdict
+
+from fragment_automaton import FragmentAutomaton, literal_anchor
+from thai_charsets import VOWEL_MARKS, TONE_MARKS, VOWEL_AND_TONE_MARKS, AMBIGUOUS_CHARS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Set UTF-8 encoding for output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-@dataclass
+# Class codes: 'V' vowel mark, 'T' tone mark, 'A' ambiguous, '.' anything else
+class _CharClassTable(dict):
+    """str.translate table: one class code per character, '.' for unlisted ones"""
+    def __missing__(self, codepoint):
+        return '.'
+
+# Pattern placeholders in PatternInfo.codepoints ('x' and 'f'); never an ord()
+CODE_X = -1
+CODE_F = -2
+
+def _candidate_regex() -> re.Pattern:
+    """
+    Vowel positions worth probing, as one regex over the raw text: explicit
+    vowel marks (tone marks excluded), plus lookaround heuristics for when an
+    ambiguous character is likely a vowel component.
+    """
+    vowels = ''.join(re.escape(c) for c in sorted(VOWEL_AND_TONE_MARKS))
+    primary = ''.join(re.escape(c) for c in sorted(VOWEL_MARKS))
+    return re.compile('|'.join([
+        f'[{primary}]',
+        f'(?<=[^{vowels}])ว',          # ว after a consonant
+        '(?<=[\\s\\S]ั)ว',              # xัว
+        'ย(?=[ .,!?]|\\Z)',             # final ย
+        '(?<=[\\s\\S][าั])ย',           # xาย, xัย
+        f'อ(?=[{vowels}])',            # อ before a vowel mark
+        '(?<=เ)อ',                     # เอ
+    ]))
+
+# Compiled once for every detector
+_CANDIDATE_RE = _candidate_regex()
+
+@dataclass(slots=True, frozen=True)
 class VowelAnchor:
     """Represents a detected vowel pattern in text"""
     pattern: str           # The vowel pattern (e.g., "xา", "เx็f")
@@ -27,7 +70,7 @@ class VowelAnchor:
     final_pos: Optional[int] = None  # Position where final ('f') should be if present
     confidence: float = 1.0  # Confidence score for ambiguous cases
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PatternInfo:
     """Metadata for a vowel pattern"""
     pattern: str
@@ -35,19 +78,62 @@ class PatternInfo:
     long_id: str
     tags: List[str]
     priority: int  # For resolving conflicts (longer patterns have higher priority)
+    x_index: int = -1  # Index of the foundation placeholder 'x' (-1 if none)
+    length: int = 0    # len(pattern)
+    codepoints: Tuple[int, ...] = ()  # ord() per character, CODE_X / CODE_F for 'x' / 'f'
+    first_literal: str = ''        # First run of literal characters (e.g. "าย" for "xาย")
+    first_literal_offset: int = 0  # Its index in the pattern
 
 class VowelAnchorDetectorV3:
     """Detects vowel patterns in Thai text using database-stored IDs"""
 
+    # Registries already built in this process, keyed by (path, mtime_ns)
+    _registry_cache: Dict[Tuple[str, int], Tuple] = {}
+
     def __init__(self, vowel_patterns_file: str):
         """Initialize with vowel pattern data including IDs"""
-        with open(vowel_patterns_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Build character sets for quick filtering
+        self.vowel_marks = VOWEL_AND_TONE_MARKS
+        self.ambiguous_chars = AMBIGUOUS_CHARS  # Can be consonant or vowel component
+        self.tone_marks = TONE_MARKS
+
+        # The same sets as a translate table, so a whole text is classified
+        # in one C-level pass
+        self._class_table = _CharClassTable(
+            {ord(c): 'A' for c in self.ambiguous_chars}
+            | {ord(c): 'V' for c in self.vowel_marks - self.tone_marks}
+            | {ord(c): 'T' for c in self.tone_marks}
+        )
+
+        # Detectors loading the same, unchanged file share one registry; it
+        # is read-only after construction
+        cache_key = (os.path.abspath(vowel_patterns_file),
+                     os.stat(vowel_patterns_file).st_mtime_ns)
+        registry = self._registry_cache.get(cache_key)
+        if registry is None:
+            registry = self._build_registry(vowel_patterns_file)
+            self._registry_cache[cache_key] = registry
+
+        (self.patterns, self.pattern_by_abbrev, self.pattern_by_long,
+         self.sorted_patterns, self.patterns_by_anchor, self.anchor_automaton,
+         self.alignment_offsets) = registry
+
+        print(f"Loaded {len(self.patterns)} vowel patterns with IDs from database")
+        print(f"Sample IDs:")
+        for pattern in ["xา", "xาย", "xาว", "ใx", "ไxย"]:
+            if pattern in self.patterns:
+                info = self.patterns[pattern]
+                print(f"  {pattern}: {info.abbrev_id} / {info.long_id}")
+
+    def _build_registry(self, vowel_patterns_file: str) -> Tuple:
+        """Parse the pattern JSON and build the lookup tables used for matching"""
+        with open(vowel_patterns_file, 'rb') as f:
+            data = orjson.loads(f.read()) if orjson is not None else json.load(f)
 
         # Build pattern registry from database
-        self.patterns = {}
-        self.pattern_by_abbrev = {}
-        self.pattern_by_long = {}
+        patterns = {}
+        pattern_by_abbrev = {}
+        pattern_by_long = {}
 
         for pattern, info in data['patterns'].items():
             # Get IDs from database
@@ -55,36 +141,63 @@ class VowelAnchorDetectorV3:
             long_id = info.get('long_id', 'UNKNOWN')
             tags = info.get('tags', [])
 
+            first_literal, first_literal_offset, _ = literal_anchor(pattern)
+
             # Store pattern info
             pattern_info = PatternInfo(
                 pattern=pattern,
                 abbrev_id=abbrev_id,
                 long_id=long_id,
                 tags=tags,
-                priority=len(pattern)  # Longer patterns get higher priority
+                priority=len(pattern),  # Longer patterns get higher priority
+                x_index=pattern.find('x'),
+                length=len(pattern),
+                codepoints=tuple(CODE_X if c == 'x' else CODE_F if c == 'f' else ord(c)
+                                 for c in pattern),
+                first_literal=first_literal,
+                first_literal_offset=first_literal_offset
             )
 
-            self.patterns[pattern] = pattern_info
-            self.pattern_by_abbrev[abbrev_id] = pattern_info
-            self.pattern_by_long[long_id] = pattern_info
-
-        # Build character sets for quick filtering
-        self.vowel_marks = {'ะ', 'ั', 'า', 'ำ', 'ิ', 'ี', 'ึ', 'ื', 'ุ', 'ู',
-                           'เ', 'แ', 'โ', 'ใ', 'ไ', '็', '่', '้', '๊', '๋'}
-        self.ambiguous_chars = {'ว', 'ย', 'อ', 'ร'}  # Can be consonant or vowel component
-        self.tone_marks = {'่', '้', '๊', '๋'}
+            patterns[pattern] = pattern_info
+            pattern_by_abbrev[abbrev_id] = pattern_info
+            pattern_by_long[long_id] = pattern_info
 
         # Sort patterns by priority (longest first) for matching
-        self.sorted_patterns = sorted(self.patterns.values(),
-                                     key=lambda p: p.priority,
-                                     reverse=True)
-
-        print(f"Loaded {len(self.patterns)} vowel patterns with IDs from database")
-        print(f"Sample IDs:")
-        for pattern in ["xา", "xาย", "xาว", "ใx", "ไxย"]:
-            if pattern in self.patterns:
-                info = self.patterns[pattern]
-                print(f"  {pattern}: {info.abbrev_id} / {info.long_id}")
+        sorted_patterns = sorted(patterns.values(),
+                                 key=lambda p: p.priority,
+                                 reverse=True)
+
+        # Each pattern's first literal fragment (e.g. "เ" for "เxือf", "าย"
+        # for "xาย"), indexed by one automaton. A hit on the fragment pins
+        # down where the pattern could start, so only those (start, pattern)
+        # pairs need to be tried. When an 'x' comes before the fragment,
+        # tone_back is how far before the hit a tone mark absorbed by that
+        # 'x' would sit (0 otherwise).
+        patterns_by_anchor = defaultdict(list)
+        for rank, pattern_info in enumerate(sorted_patterns):
+            offset = pattern_info.first_literal_offset
+            x_index = pattern_info.x_index
+            tone_back = offset - x_index if 0 <= x_index < offset else 0
+            patterns_by_anchor[pattern_info.first_literal].append((rank, offset, tone_back))
+        anchor_automaton = FragmentAutomaton(patterns_by_anchor)
+
+        # For each pattern, the (alignment, offset) pairs that probe it: a
+        # pattern starting at s is tried from vowel position s + offset with
+        # the start (0), foundation (1) or end (2) alignment. Alignments that
+        # land on the same offset (a leading 'x', a one-character pattern)
+        # would probe the same start twice, so only the first is kept.
+        alignment_offsets = []
+        for pattern_info in sorted_patterns:
+            offsets = [(0, 0)]
+            if pattern_info.x_index > 0:
+                offsets.append((1, pattern_info.x_index))
+            end_offset = pattern_info.length - 1
+            if all(offset != end_offset for _, offset in offsets):
+                offsets.append((2, end_offset))
+            alignment_offsets.append(tuple(offsets))
+
+        return (patterns, pattern_by_abbrev, pattern_by_long, sorted_patterns,
+                patterns_by_anchor, anchor_automaton, alignment_offsets)
 
     def detect_vowel_anchors(self, text: str) -> List[VowelAnchor]:
         """
@@ -93,193 +206,174 @@ class VowelAnchorDetectorV3:
         """
         anchors = []
         text_len = len(text)
-        used_positions = set()
-
-        # Scan through text
-        for i in range(text_len):
-            # Quick check: is there a potential vowel component here?
-            if not self._has_vowel_potential(text, i):
+        used_positions = bytearray(text_len)  # 1 where an anchor already claimed the character
+
+        # Classify every character once and take its code point
+        char_classes = text.translate(self._class_table)
+        codes = array('i', map(ord, text))
+
+        patterns_by_anchor = self.patterns_by_anchor
+        alignment_offsets = self.alignment_offsets
+
+        # Candidate start positions -> ranks of patterns that could start there
+        starts_at = defaultdict(set)
+        for end_index, fragment in self.anchor_automaton.iter_hits(text):
+            hit_pos = end_index - len(fragment) + 1
+            for rank, offset, tone_back in patterns_by_anchor[fragment]:
+                starts_at[hit_pos - offset].add(rank)
+                if tone_back and hit_pos >= tone_back and char_classes[hit_pos - tone_back] == 'T':
+                    # The 'x' before the fragment absorbed this tone mark
+                    starts_at[hit_pos - offset - 1].add(rank)
+
+        # Index each candidate by the vowel positions that would probe it
+        probes_at = defaultdict(list)
+        for start_pos, ranks in starts_at.items():
+            if start_pos < 0:
                 continue
+            for rank in ranks:
+                for alignment, offset in alignment_offsets[rank]:
+                    probes_at[start_pos + offset].append((rank, alignment, start_pos))
+
+        # Vowel marks are candidates outright, ambiguous characters only when
+        # their context suggests a vowel (both in _CANDIDATE_RE). Scan left
+        # to right. Every successful probe at a candidate covers that
+        # candidate, so once an anchor is accepted nothing up to its end can
+        # match again; resume the scan just past it.
+        search = _CANDIDATE_RE.search
+        find_matches = self._find_pattern_matches_at_position
+        scan_pos = 0
+        while True:
+            match = search(text, scan_pos)
+            if match is None:
+                break
+            i = match.start()
+            scan_pos = i + 1
 
             # Try to match patterns at this position
-            matches = self._find_pattern_matches_at_position(text, i, used_positions)
+            matches = find_matches(text, i, used_positions, probes_at,
+                                   char_classes, codes)
 
             # Add best match if found
             if matches:
-                best_match = matches[0]  # Already sorted by priority
+                best_match = matches[0]
                 anchors.append(best_match)
 
                 # Mark positions as used
-                for pos in range(best_match.start_pos, best_match.end_pos + 1):
-                    used_positions.add(pos)
+                span_start, span_end = best_match.start_pos, best_match.end_pos + 1
+                used_positions[span_start:span_end] = b'\x01' * (span_end - span_start)
                 if best_match.foundation_pos is not None:
-                    used_positions.add(best_match.foundation_pos)
+                    used_positions[best_match.foundation_pos] = 1
                 if best_match.final_pos is not None:
-                    used_positions.add(best_match.final_pos)
+                    used_positions[best_match.final_pos] = 1
+                scan_pos = best_match.end_pos + 1
 
         # Sort anchors by position
         anchors.sort(key=lambda a: a.start_pos)
 
         return anchors
 
-    def _has_vowel_potential(self, text: str, pos: int) -> bool:
-        """Check if position could be part of a vowel pattern"""
-        if pos >= len(text):
-            return False
-
-        char = text[pos]
-
-        # Explicit vowel mark (excluding tone marks for primary detection)
-        if char in self.vowel_marks and char not in self.tone_marks:
-            return True
-
-        # Ambiguous character that might be part of vowel
-        if char in self.ambiguous_chars:
-            # Check context to determine if likely vowel component
-            return self._check_ambiguous_context(text, pos)
-
-        return False
-
-    def _check_ambiguous_context(self, text: str, pos: int) -> bool:
-        """Check if ambiguous character is likely part of vowel pattern"""
-        char = text[pos]
-
-        # Enhanced heuristics
-        if char == 'ว':
-            # Check if preceded by consonant (likely vowel)
-            if pos > 0 and text[pos-1] not in self.vowel_marks:
-                return True
-            # Check if part of xัว pattern
-            if pos > 1 and text[pos-1] == 'ั':
-                return True
-
-        if char == 'ย':
-            # Check if at end or followed by space/punctuation (likely final)
-            if pos == len(text) - 1 or (pos < len(text) - 1 and text[pos+1] in ' .,!?'):
-                return True
-            # Check if part of xาย, xัย patterns
-            if pos > 1 and text[pos-1] in 'าั':
-                return True
-
-        if char == 'อ':
-            # Check if followed by vowel mark (likely part of pattern)
-            if pos < len(text) - 1 and text[pos+1] in self.vowel_marks:
-                return True
-            # Check if preceded by เ (เอ pattern)
-            if pos > 0 and text[pos-1] == 'เ':
-                return True
-
-        return False
-
     def _find_pattern_matches_at_position(self, text: str, pos: int,
-                                         used: Set[int]) -> List[VowelAnchor]:
-        """Find all patterns that could match at or near this position"""
-        matches = []
-
-        for pattern_info in self.sorted_patterns:
-            pattern = pattern_info.pattern
-
-            # Try different alignment strategies
-            # Strategy 1: Pattern starts at current position
-            anchor = self._try_match_pattern(text, pos, pattern_info, used, 'start')
-            if anchor:
-                matches.append(anchor)
-
-            # Strategy 2: Pattern's 'x' aligns with current position
-            if 'x' in pattern:
-                anchor = self._try_match_pattern(text, pos, pattern_info, used, 'foundation')
-                if anchor:
-                    matches.append(anchor)
-
-            # Strategy 3: Pattern ends at current position
-            anchor = self._try_match_pattern(text, pos, pattern_info, used, 'end')
+                                         used: bytearray,
+                                         probes_at: Dict[int, List[Tuple[int, int, int]]],
+                                         char_classes: str,
+                                         codes: array) -> List[VowelAnchor]:
+        """
+        Find the best pattern match at or near this position.
+        Returns a list holding the best anchor, or an empty list.
+        """
+        found = []
+        try_match = self._try_match_at_start
+        sorted_patterns = self.sorted_patterns
+
+        # Only the (pattern, alignment, start) probes indexed at this
+        # position; each (pattern, start) pair appears at most once
+        for rank, alignment, start_pos in probes_at.get(pos, ()):
+            anchor = try_match(text, start_pos, sorted_patterns[rank],
+                               used, char_classes, codes)
             if anchor:
-                matches.append(anchor)
-
-        # Sort by confidence and priority
-        matches.sort(key=lambda m: (m.confidence, self.patterns[m.pattern].priority),
-                    reverse=True)
-
-        return matches
-
-    def _try_match_pattern(self, text: str, pos: int, pattern_info: PatternInfo,
-                           used: Set[int], alignment: str) -> Optional[VowelAnchor]:
-        """Try to match a pattern with specific alignment"""
-        pattern = pattern_info.pattern
-
-        # Calculate starting position based on alignment
-        if alignment == 'start':
-            start_pos = pos
-        elif alignment == 'foundation':
-            # Find where pattern starts if 'x' is at pos
-            x_index = pattern.index('x') if 'x' in pattern else 0
-            start_pos = pos - x_index
-        elif alignment == 'end':
-            start_pos = pos - len(pattern) + 1
-        else:
-            return None
+                found.append((rank, alignment, anchor))
+
+        if not found:
+            return []
+
+        # Highest confidence and priority wins; ties go to pattern order,
+        # then alignment order - as a scan over sorted_patterns would have
+        # found them
+        _, _, best = min(found, key=lambda m: (-m[2].confidence,
+                                               -sorted_patterns[m[0]].priority,
+                                               m[0], m[1]))
+        return [best]
+
+    def _try_match_at_start(self, text: str, start_pos: int, pattern_info: PatternInfo,
+                            used: bytearray,
+                            char_classes: Optional[str] = None,
+                            codes: Optional[array] = None) -> Optional[VowelAnchor]:
+        """
+        Try to match a pattern whose first character is at start_pos.
+        char_classes is text translated through the class table and codes is
+        array('i') of its code points (each computed here if not given), so
+        the walk compares ints against pattern_info.codepoints.
+        """
+        if char_classes is None:
+            char_classes = text.translate(self._class_table)
+        if codes is None:
+            codes = array('i', map(ord, text))
+        text_len = len(codes)
 
         # Check bounds
-        if start_pos < 0 or start_pos + len(pattern) > len(text):
+        if start_pos < 0 or start_pos + pattern_info.length > text_len:
             return None
 
-        # Try to match pattern
+        # Try to match pattern. The first pattern character always lands on
+        # start_pos; end_pos follows the last matched character. A character
+        # already claimed by another anchor rejects the match on the spot.
         foundation_pos = None
         final_pos = None
-        matched_positions = []
+        end_pos = start_pos
 
-        pattern_idx = 0
         text_idx = start_pos
 
-        while pattern_idx < len(pattern):
-            p_char = pattern[pattern_idx]
+        for p_code in pattern_info.codepoints:
+            if text_idx >= text_len or used[text_idx]:
+                return None
 
-            if p_char == 'x':
+            if p_code == CODE_X:
                 # Foundation placeholder - skip consonant(s)
-                foundation_pos = text_idx
                 # For now, assume single consonant (can be enhanced for clusters)
-                if text_idx < len(text) and text[text_idx] not in self.vowel_marks:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                    # Check for tone mark after consonant
-                    if text_idx < len(text) and text[text_idx] in self.tone_marks:
-                        text_idx += 1  # Skip tone mark but don't add to matched positions
-                else:
+                if char_classes[text_idx] in 'VT':
                     return None
+                foundation_pos = end_pos = text_idx
+                text_idx += 1
+                # Check for tone mark after consonant
+                if text_idx < text_len and char_classes[text_idx] == 'T':
+                    text_idx += 1  # Skip tone mark but don't count it as matched
 
-            elif p_char == 'f':
+            elif p_code == CODE_F:
                 # Final consonant placeholder
-                final_pos = text_idx
-                if text_idx < len(text) and text[text_idx] not in self.vowel_marks:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                else:
+                if char_classes[text_idx] in 'VT':
                     return None
+                final_pos = end_pos = text_idx
+                text_idx += 1
 
-            else:
-                # Must match exact character
-                if text_idx < len(text) and text[text_idx] == p_char:
-                    matched_positions.append(text_idx)
-                    text_idx += 1
-                else:
-                    return None
-
-            pattern_idx += 1
+            elif codes[text_idx] == p_code:
+                # Exact character
+                end_pos = text_idx
+                text_idx += 1
 
-        # Check if any positions are already used
-        if any(pos in used for pos in matched_positions):
-            return None
+            else:
+                return None
 
         # Create anchor with IDs from database
+        confidence = 1.0  # Can be adjusted based on context
         return VowelAnchor(
-            pattern=pattern,
+            pattern=pattern_info.pattern,
             abbrev_id=pattern_info.abbrev_id,
             long_id=pattern_info.long_id,
-            start_pos=min(matched_positions) if matched_positions else start_pos,
-            end_pos=max(matched_positions) if matched_positions else start_pos,
+            start_pos=start_pos,
+            end_pos=end_pos,
             foundation_pos=foundation_pos,
             final_pos=final_pos,
-            confidence=1.0  # Can be adjusted based on context
+            confidence=confidence
         )
 
     def analyze_text(self, text: str) -> Dict:
@@ -297,7 +391,7 @@ class VowelAnchorDetectorV3:
             'coverage': 0.0
         }
 
-        covered_positions = set()
+        covered_positions = bytearray(len(text))  # 1 where an anchor covers the character
 
         for anchor in anchors:
             anchor_info = {
@@ -320,16 +414,16 @@ class VowelAnchorDetectorV3:
             analysis['anchors'].append(anchor_info)
 
             # Track coverage
-            for pos in range(anchor.start_pos, anchor.end_pos + 1):
-                covered_positions.add(pos)
+            span_start, span_end = anchor.start_pos, anchor.end_pos + 1
+            covered_positions[span_start:span_end] = b'\x01' * (span_end - span_start)
             if anchor.foundation_pos is not None:
-                covered_positions.add(anchor.foundation_pos)
+                covered_positions[anchor.foundation_pos] = 1
             if anchor.final_pos is not None:
-                covered_positions.add(anchor.final_pos)
+                covered_positions[anchor.final_pos] = 1
 
         # Calculate coverage
         if len(text) > 0:
-            analysis['coverage'] = len(covered_positions) / len(text)
+            analysis['coverage'] = covered_positions.count(1) / len(text)
 
         return analysis
 
@@ -1,20 +1,54 @@
 #!/usr/bin/env python3
 """
 Simple Vowel Finder Algorithm
-Finds all possible vowel patterns in Thai text without optimization
+Finds all possible vowel patterns in Thai text, probing only the candidates
+found by a FragmentAutomaton scan for each pattern's literal fragments
 Returns numbered data structure with 1-based indexing
 """
 
 import json
+import os
 import sys
 import io
-from typing import Dict, List, Tuple
+from array import array
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
+from collections import defaultdict
+
+from fragment_automaton import FragmentAutomaton, literal_anchor
+from thai_charsets import CONSONANTS, VOWEL_MARKS, TONE_MARKS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Set UTF-8 encoding
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-@dataclass
+# Class bits per code point of the Thai block (U+0E00-U+0E7F); nothing
+# outside the block is a consonant or tone mark
+THAI_BLOCK_START = 0x0E00
+THAI_BLOCK_SIZE = 0x80
+BIT_TONE = 0x01
+BIT_CONSONANT = 0x02
+
+def _class_table() -> bytes:
+    """Class bits for each code point of the Thai block, indexed from its start"""
+    table = bytearray(THAI_BLOCK_SIZE)
+    for bit, chars in ((BIT_TONE, TONE_MARKS), (BIT_CONSONANT, CONSONANTS)):
+        for char in chars:
+            table[ord(char) - THAI_BLOCK_START] |= bit
+    return bytes(table)
+
+# Built once for every finder
+_CLASS_TABLE = _class_table()
+
+# Pattern placeholders in a pattern's codepoints ('x' and 'f'); never an ord()
+CODE_X = -1
+CODE_F = -2
+
+@dataclass(slots=True, frozen=True)
 class VowelMatch:
     """Single possible vowel pattern match"""
     pattern: str          # The pattern template (e.g., "xา", "เxf")
@@ -24,51 +58,173 @@ class VowelMatch:
     foundation_pos: int   # Where 'x' maps to
     final_pos: int = None # Where 'f' maps to if present
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class VowelData:
     """All data for a single vowel position"""
     vowel_number: int                    # 1-based index
     possible_patterns: List[VowelMatch]  # All possible pattern matches
     text_positions: Tuple[int, int]      # Overall span in text
 
+def _match_at(codes: array, start: int, pattern_codes: Tuple[int, ...],
+              class_table: bytes) -> Optional[Tuple[Optional[int], Optional[int], int]]:
+    """
+    Walk a pattern over text from start.
+
+    Flat function over plain arguments, kept free of attribute lookups and
+    object construction so the per-character loop stays tight. codes holds
+    the text's code points and pattern_codes the pattern's (CODE_X / CODE_F
+    for placeholders), so every step is an int compare or a single byte
+    load from class_table (see _CLASS_TABLE). Returns (foundation_pos,
+    final_pos, end_pos) for a match, otherwise None.
+    """
+    text_len = len(codes)
+    foundation_pos = None
+    final_pos = None
+    end_pos = -1
+    text_idx = start
+
+    for p_code in pattern_codes:
+        if text_idx >= text_len:
+            return None
+        code = codes[text_idx]
+
+        if p_code == CODE_X:
+            # Must be consonant
+            block_idx = code - THAI_BLOCK_START
+            if not (0 <= block_idx < THAI_BLOCK_SIZE and class_table[block_idx] & BIT_CONSONANT):
+                return None
+            foundation_pos = end_pos = text_idx
+            text_idx += 1
+            # Skip tone mark if present
+            if text_idx < text_len:
+                block_idx = codes[text_idx] - THAI_BLOCK_START
+                if 0 <= block_idx < THAI_BLOCK_SIZE and class_table[block_idx] & BIT_TONE:
+                    text_idx += 1
+
+        elif p_code == CODE_F:
+            # Must be consonant (final)
+            block_idx = code - THAI_BLOCK_START
+            if not (0 <= block_idx < THAI_BLOCK_SIZE and class_table[block_idx] & BIT_CONSONANT):
+                return None
+            final_pos = end_pos = text_idx
+            text_idx += 1
+
+        else:
+            # Must match exact character
+            if code != p_code:
+                return None
+            end_pos = text_idx
+            text_idx += 1
+
+    if end_pos < 0:
+        return None
+    return foundation_pos, final_pos, end_pos
+
 class VowelFinder:
     """Finds all vowel patterns in Thai text"""
 
+    # Registries already built in this process, keyed by (path, mtime_ns)
+    _registry_cache: Dict[Tuple[str, int], Tuple] = {}
+
     def __init__(self, patterns_file: str):
         """Load patterns database"""
-        with open(patterns_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Finders loading the same, unchanged file share one registry
+        cache_key = (os.path.abspath(patterns_file), os.stat(patterns_file).st_mtime_ns)
+        registry = self._registry_cache.get(cache_key)
+        if registry is None:
+            registry = self._build_registry(patterns_file)
+            self._registry_cache[cache_key] = registry
+        (self.patterns, self.pattern_order,
+         self.patterns_by_anchor, self.anchor_automaton) = registry
+
+        # Character sets
+        self.vowel_chars = VOWEL_MARKS
+        self.consonants = CONSONANTS
+        self.tone_marks = TONE_MARKS
+
+    def _build_registry(self, patterns_file: str) -> Tuple:
+        """Parse the patterns JSON and index each pattern by its first literal fragment"""
+        with open(patterns_file, 'rb') as f:
+            data = orjson.loads(f.read()) if orjson is not None else json.load(f)
 
-        self.patterns = {}
+        patterns = {}
         for pattern, info in data['patterns'].items():
-            self.patterns[pattern] = {
+            patterns[pattern] = {
                 'abbrev_id': info.get('abbrev_id', 'unknown'),
-                'tags': info.get('tags', [])
+                'tags': info.get('tags', []),
+                'x_index': pattern.find('x'),  # -1 if no 'x'
+                'length': len(pattern),
+                'codepoints': tuple(CODE_X if c == 'x' else CODE_F if c == 'f' else ord(c)
+                                    for c in pattern)
             }
 
-        # Character sets
-        self.vowel_chars = {'ะ', 'ั', 'า', 'ำ', 'ิ', 'ี', 'ึ', 'ื', 'ุ', 'ู',
-                           'เ', 'แ', 'โ', 'ใ', 'ไ', '็'}
-        self.consonants = {
-            'ก', 'ข', 'ฃ', 'ค', 'ฅ', 'ฆ', 'ง', 'จ', 'ฉ', 'ช', 'ซ', 'ฌ', 'ญ',
-            'ฎ', 'ฏ', 'ฐ', 'ฑ', 'ฒ', 'ณ', 'ด', 'ต', 'ถ', 'ท', 'ธ', 'น', 'บ',
-            'ป', 'ผ', 'ฝ', 'พ', 'ฟ', 'ภ', 'ม', 'ย', 'ร', 'ล', 'ว', 'ศ', 'ษ',
-            'ส', 'ห', 'ฬ', 'อ', 'ฮ'
-        }
-        self.tone_marks = {'่', '้', '๊', '๋'}
+        # Each pattern's first literal fragment, indexed by one automaton; a
+        # hit on it pins down where the pattern could start. tone_back is how
+        # far before the hit a tone mark absorbed by an earlier 'x' would sit
+        # (0 if no 'x' comes before the fragment).
+        pattern_order = {pattern: order for order, pattern in enumerate(patterns)}
+        patterns_by_anchor = defaultdict(list)
+        for pattern, info in patterns.items():
+            fragment, offset, _ = literal_anchor(pattern)
+            x_index = info['x_index']
+            tone_back = offset - x_index if 0 <= x_index < offset else 0
+            patterns_by_anchor[fragment].append((pattern, offset, tone_back))
+        anchor_automaton = FragmentAutomaton(patterns_by_anchor)
+
+        return patterns, pattern_order, patterns_by_anchor, anchor_automaton
 
     def find_vowels(self, text: str) -> Dict[int, VowelData]:
         """
         Find all vowel patterns in text
         Returns dict with 1-based indexing: {1: VowelData, 2: VowelData, ...}
         """
-        all_matches = []
-
-        # Try every pattern at every position (brute force)
-        for pos in range(len(text)):
-            for pattern in self.patterns:
-                matches = self._try_pattern_at_position(text, pos, pattern)
-                all_matches.extend(matches)
+        codes = array('i', map(ord, text))
+        text_len = len(codes)
+        class_table = _CLASS_TABLE
+
+        # Candidate (start, pattern) pairs from the literal fragment hits
+        candidates = set()
+        for end_index, fragment in self.anchor_automaton.iter_hits(text):
+            hit_pos = end_index - len(fragment) + 1
+            for pattern, offset, tone_back in self.patterns_by_anchor[fragment]:
+                candidates.add((hit_pos - offset, pattern))
+                if tone_back and hit_pos >= tone_back:
+                    block_idx = codes[hit_pos - tone_back] - THAI_BLOCK_START
+                    if 0 <= block_idx < THAI_BLOCK_SIZE and class_table[block_idx] & BIT_TONE:
+                        # The 'x' before the fragment absorbed this tone mark
+                        candidates.add((hit_pos - offset - 1, pattern))
+
+        # Verify each candidate once. The brute-force scan over every position
+        # found a match twice - at its start, and again with 'x' at the
+        # current position - so both entries are kept, in the order that scan
+        # produced them (position, pattern, alignment).
+        # Candidates go straight to the _match_at kernel; a VowelMatch is
+        # only built for the ones that match.
+        patterns = self.patterns
+        found = []
+        for start, pattern in candidates:
+            info = patterns[pattern]
+            if start < 0 or start + info['length'] > text_len:
+                continue
+            hit = _match_at(codes, start, info['codepoints'], class_table)
+            if hit is None:
+                continue
+            foundation_pos, final_pos, end_pos = hit
+            match = VowelMatch(
+                pattern=pattern,
+                abbrev_id=info['abbrev_id'],
+                start_pos=start,
+                end_pos=end_pos,
+                foundation_pos=foundation_pos,
+                final_pos=final_pos
+            )
+            order = self.pattern_order[pattern]
+            found.append((start, order, 0, match))
+            x_index = info['x_index']
+            if x_index >= 0:
+                found.append((start + x_index, order, 1, match))
+        found.sort(key=lambda entry: entry[:3])
+        all_matches = [match for _, _, _, match in found]
 
         # Group matches by their vowel components
         vowel_groups = self._group_by_vowel_position(all_matches)
@@ -84,95 +240,6 @@ class VowelFinder:
 
         return result
 
-    def _try_pattern_at_position(self, text: str, pos: int, pattern: str) -> List[VowelMatch]:
-        """Try to match a pattern starting at different alignments from pos"""
-        matches = []
-
-        # Try different alignments
-        for alignment in ['pattern_start', 'x_at_pos', 'pattern_contains_pos']:
-            match = self._match_pattern(text, pos, pattern, alignment)
-            if match:
-                matches.append(match)
-
-        return matches
-
-    def _match_pattern(self, text: str, pos: int, pattern: str, alignment: str) -> VowelMatch:
-        """Match a specific pattern with given alignment"""
-
-        # Calculate start position based on alignment
-        if alignment == 'pattern_start':
-            start = pos
-        elif alignment == 'x_at_pos':
-            if 'x' not in pattern:
-                return None
-            x_idx = pattern.index('x')
-            start = pos - x_idx
-        elif alignment == 'pattern_contains_pos':
-            # Try to see if pattern could contain this position
-            # For simplicity, skip this complex alignment for now
-            return None
-        else:
-            return None
-
-        # Check bounds
-        if start < 0 or start + len(pattern) > len(text):
-            return None
-
-        # Try to match character by character
-        text_idx = start
-        pattern_idx = 0
-        foundation_pos = None
-        final_pos = None
-        matched_positions = []
-
-        while pattern_idx < len(pattern):
-            if text_idx >= len(text):
-                return None
-
-            p_char = pattern[pattern_idx]
-            t_char = text[text_idx]
-
-            if p_char == 'x':
-                # Must be consonant
-                if t_char not in self.consonants:
-                    return None
-                foundation_pos = text_idx
-                matched_positions.append(text_idx)
-                text_idx += 1
-                # Skip tone mark if present
-                if text_idx < len(text) and text[text_idx] in self.tone_marks:
-                    text_idx += 1
-
-            elif p_char == 'f':
-                # Must be consonant (final)
-                if t_char not in self.consonants:
-                    return None
-                final_pos = text_idx
-                matched_positions.append(text_idx)
-                text_idx += 1
-
-            else:
-                # Must match exact character
-                if t_char != p_char:
-                    return None
-                matched_positions.append(text_idx)
-                text_idx += 1
-
-            pattern_idx += 1
-
-        # Success - create match
-        if matched_positions:
-            return VowelMatch(
-                pattern=pattern,
-                abbrev_id=self.patterns[pattern]['abbrev_id'],
-                start_pos=min(matched_positions),
-                end_pos=max(matched_positions),
-                foundation_pos=foundation_pos,
-                final_pos=final_pos
-            )
-
-        return None
-
     def _group_by_vowel_position(self, matches: List[VowelMatch]) -> List[Tuple[Tuple[int, int], List[VowelMatch]]]:
         """Group matches that represent the same vowel occurrence"""
         if not matches:
@@ -181,42 +248,33 @@ class VowelFinder:
         # Sort by start position
         matches.sort(key=lambda m: m.start_pos)
 
-        # Group overlapping matches
+        # Sweep for the union of overlapping spans. Starts are non-decreasing
+        # and every match ends at or after its start, so a match joins the
+        # current group exactly when it starts at or before the group's end.
         groups = []
-        current_group = []
-        current_span = None
+        first = matches[0]
+        current_group = [first]
+        group_start = first.start_pos
+        group_end = first.end_pos
 
-        for match in matches:
-            match_span = (match.start_pos, match.end_pos)
-
-            if current_span is None:
-                # First match
-                current_span = match_span
-                current_group = [match]
-            elif self._spans_overlap(current_span, match_span):
+        for match in matches[1:]:
+            if match.start_pos <= group_end:
                 # Overlaps with current group
                 current_group.append(match)
-                # Extend span
-                current_span = (
-                    min(current_span[0], match_span[0]),
-                    max(current_span[1], match_span[1])
-                )
+                if match.end_pos > group_end:
+                    group_end = match.end_pos
             else:
                 # New group
-                groups.append((current_span, current_group))
-                current_span = match_span
+                groups.append(((group_start, group_end), current_group))
                 current_group = [match]
+                group_start = match.start_pos
+                group_end = match.end_pos
 
         # Add last group
-        if current_group:
-            groups.append((current_span, current_group))
+        groups.append(((group_start, group_end), current_group))
 
         return groups
 
-    def _spans_overlap(self, span1: Tuple[int, int], span2: Tuple[int, int]) -> bool:
-        """Check if two spans overlap"""
-        return not (span1[1] < span2[0] or span2[1] < span1[0])
-
 
 def main():
     """Test the vowel finder"""
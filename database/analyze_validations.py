@@ -9,6 +9,21 @@ import sqlite3
 import json
 from pathlib import Path
 from collections import Counter, defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson is optional; the stdlib parser gives the same result, just slower
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _sql_limit(limit):
+    """LIMIT value for an optional row cap (-1 means no limit in SQLite)"""
+    return -1 if limit is None else limit
 
 
 class ValidationAnalyzer:
@@ -16,11 +31,34 @@ class ValidationAnalyzer:
         self.db_path = Path(db_path)
         if not self.db_path.exists():
             raise FileNotFoundError(f"Database not found: {self.db_path}")
+        self._conn = None
+
+    def _get_conn(self):
+        """Open the database on first use; later queries share the connection"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA cache_size=-65536")      # 64 MiB page cache
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA mmap_size=268435456")    # 256 MiB
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        """Close the shared connection, if one was opened"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def get_invalid_component_stats(self):
         """Get statistics on invalid components marked by users"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
 
         # Get counts by component type
         cursor.execute("""
@@ -51,8 +89,6 @@ class ValidationAnalyzer:
         """)
         problematic_values = cursor.fetchall()
 
-        conn.close()
-
         return {
             'component_types': component_types,
             'reasons': reasons,
@@ -61,8 +97,7 @@ class ValidationAnalyzer:
 
     def get_validation_summary(self):
         """Get overall validation statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
 
         # Total interpretations by status
         cursor.execute("""
@@ -98,8 +133,6 @@ class ValidationAnalyzer:
         """)
         invalid_clusters = cursor.fetchall()
 
-        conn.close()
-
         return {
             'total_words': total_words,
             'avg_interpretations_per_word': round(avg_interpretations, 2),
@@ -107,10 +140,13 @@ class ValidationAnalyzer:
             'top_invalid_clusters': invalid_clusters
         }
 
-    def find_patterns_in_invalid_finals(self):
-        """Analyze patterns in components marked as invalid finals"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def find_patterns_in_invalid_finals(self, limit=None):
+        """Analyze patterns in components marked as invalid finals
+
+        Returns every final unless limit is given, in which case SQLite
+        only hands back the top `limit` rows.
+        """
+        cursor = self._get_conn().cursor()
 
         cursor.execute("""
             SELECT component_value, COUNT(*) as occurrences
@@ -118,10 +154,10 @@ class ValidationAnalyzer:
             WHERE component_type = 'final'
             GROUP BY component_value
             ORDER BY occurrences DESC
-        """)
+            LIMIT ?
+        """, (_sql_limit(limit),))
 
         invalid_finals = cursor.fetchall()
-        conn.close()
 
         print("\n=== Invalid Final Consonants Analysis ===")
         print("Characters frequently marked as invalid in final position:")
@@ -130,10 +166,12 @@ class ValidationAnalyzer:
 
         return invalid_finals
 
-    def analyze_vowel_pattern_errors(self):
-        """Analyze vowel patterns that are frequently marked invalid"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def analyze_vowel_pattern_errors(self, limit=None):
+        """Analyze vowel patterns that are frequently marked invalid
+
+        As with find_patterns_in_invalid_finals, limit caps each list in SQL.
+        """
+        cursor = self._get_conn().cursor()
 
         cursor.execute("""
             SELECT ic.component_value, COUNT(*) as error_count
@@ -141,7 +179,8 @@ class ValidationAnalyzer:
             WHERE ic.component_type = 'vowel'
             GROUP BY ic.component_value
             ORDER BY error_count DESC
-        """)
+            LIMIT ?
+        """, (_sql_limit(limit),))
 
         invalid_vowels = cursor.fetchall()
 
@@ -152,12 +191,11 @@ class ValidationAnalyzer:
             WHERE component_type = 'pattern'
             GROUP BY component_value
             ORDER BY count DESC
-        """)
+            LIMIT ?
+        """, (_sql_limit(limit),))
 
         invalid_patterns = cursor.fetchall()
 
-        conn.close()
-
         print("\n=== Vowel Pattern Analysis ===")
         print("Vowels frequently marked as invalid:")
         for vowel, count in invalid_vowels[:10]:
@@ -172,59 +210,85 @@ class ValidationAnalyzer:
             'invalid_patterns': invalid_patterns
         }
 
+    def count_invalid_cluster(self, cluster):
+        """Count invalid foundation/final components that are exactly this cluster
+
+        The labeler records a cluster as the foundation or final it forms,
+        with list values stored comma-joined (e.g. 'ก,ร' for ['ก', 'ร']).
+        """
+        cursor = self._get_conn().cursor()
+
+        cursor.execute("""
+            SELECT COUNT(*)
+            FROM invalid_components
+            WHERE component_type IN ('foundation', 'final')
+              AND component_value IN (?, ?)
+        """, (','.join(cluster), cluster))
+
+        return cursor.fetchone()[0]
+
     def export_validation_data(self, output_file="validation_analysis.json"):
         """Export all validation data for external analysis"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
 
-        # Get all validated interpretations with their components
+        # Get all validated interpretations with their invalid components in
+        # one query: one row per component, or a single row with NULL
+        # component columns when there are none
         cursor.execute("""
             SELECT
                 i.id,
                 w.word,
                 i.interpretation_json,
                 i.validity_status,
-                i.synonymous_with_id
+                i.synonymous_with_id,
+                ic.component_type,
+                ic.component_value,
+                ic.invalid_reason
             FROM interpretations i
             JOIN words w ON i.word_id = w.id
+            LEFT JOIN invalid_components ic
+                ON ic.interpretation_id = i.id AND i.validity_status = 'invalid'
             WHERE i.validity_status != 'unlabeled'
+            ORDER BY i.id, ic.id
         """)
 
-        interpretations = []
-        for row in cursor.fetchall():
-            interp_id, word, interp_json, status, synonym_id = row
-            interp_data = json.loads(interp_json)
-
-            # Get invalid components if any
-            invalid_components = []
-            if status == 'invalid':
-                cursor.execute("""
-                    SELECT component_type, component_value, invalid_reason
-                    FROM invalid_components
-                    WHERE interpretation_id = ?
-                """, (interp_id,))
+        # Stream rows straight from the cursor and write each interpretation
+        # as it is built; the output matches json.dump(..., indent=2)
+        count = 0
+        output_path = Path(output_file)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for _, rows in groupby(cursor, key=itemgetter(0)):
+                rows = list(rows)
+                _, word, interp_json, status, synonym_id = rows[0][:5]
+                interp_data = _loads(interp_json)
+
+                # Invalid components, if any
                 invalid_components = [
                     {'type': t, 'value': v, 'reason': r}
-                    for t, v, r in cursor.fetchall()
+                    for *_, t, v, r in rows
+                    if t is not None
                 ]
 
-            interpretations.append({
-                'word': word,
-                'interpretation': interp_data,
-                'validity_status': status,
-                'synonymous_with_id': synonym_id,
-                'invalid_components': invalid_components
-            })
-
-        conn.close()
-
-        # Save to JSON file
-        output_path = Path(output_file)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(interpretations, f, ensure_ascii=False, indent=2)
-
-        print(f"\n=== Exported {len(interpretations)} validated interpretations to {output_file} ===")
-        return len(interpretations)
+                item = {
+                    'word': word,
+                    'interpretation': interp_data,
+                    'validity_status': status,
+                    'synonymous_with_id': synonym_id,
+                    'invalid_components': invalid_components
+                }
+                if orjson is not None:
+                    item = orjson.dumps(item, option=orjson.OPT_INDENT_2).decode('utf-8')
+                else:
+                    item = json.dumps(item, ensure_ascii=False, indent=2)
+
+                f.write(',\n' if count else '\n')
+                f.write('  ' + item.replace('\n', '\n  '))
+                count += 1
+            f.write('\n]' if count else ']')
+
+        print(f"\n=== Exported {count} validated interpretations to {output_file} ===")
+        return count
 
     def generate_report(self):
         """Generate a comprehensive report of validation findings"""
@@ -250,9 +314,9 @@ class ValidationAnalyzer:
         for comp_type, value, count in stats['problematic_values'][:10]:
             print(f"  {comp_type} '{value}': {count} errors")
 
-        # Specific pattern analyses
-        self.find_patterns_in_invalid_finals()
-        self.analyze_vowel_pattern_errors()
+        # Specific pattern analyses (only the top 10 of each are printed)
+        self.find_patterns_in_invalid_finals(limit=10)
+        self.analyze_vowel_pattern_errors(limit=10)
 
         print("\n" + "=" * 60)
         print("END OF REPORT")
@@ -261,27 +325,18 @@ class ValidationAnalyzer:
 
 def main():
     """Main function to run analysis"""
-    analyzer = ValidationAnalyzer()
-
-    # Generate full report
-    analyzer.generate_report()
-
-    # Export data for external analysis
-    analyzer.export_validation_data()
-
-    # Example query for specific invalid cluster analysis
-    print("\n=== Custom Query Example ===")
-    print("Finding all interpretations where 'กร' was marked as invalid cluster:")
-
-    conn = sqlite3.connect(analyzer.db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM invalid_components
-        WHERE component_type = 'cluster' AND component_value LIKE '%กร%'
-    """)
-    count = cursor.fetchone()[0]
-    conn.close()
+    with ValidationAnalyzer() as analyzer:
+        # Generate full report
+        analyzer.generate_report()
+
+        # Export data for external analysis
+        analyzer.export_validation_data()
+
+        # Example query for specific invalid cluster analysis
+        print("\n=== Custom Query Example ===")
+        print("Finding all interpretations where 'กร' was marked as invalid cluster:")
+
+        count = analyzer.count_invalid_cluster('กร')
 
     print(f"Found {count} cases where 'กร' cluster was marked invalid")
 
@@ -11,6 +11,11 @@ from typing import Dict, List, Tuple
 import sys
 import io
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Set UTF-8 encoding for output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
@@ -18,6 +23,9 @@ sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.path.append(str(Path(__file__).parent.parent))
 from database.query_utilities import ThaiGraphemeQuery
 
+# orjson is optional; the stdlib parser gives the same result, just slower
+_loads = orjson.loads if orjson is not None else json.loads
+
 class PatternExtractor:
     def __init__(self, labels_db="database/thai_syllable_labels.db",
                  graphemes_db="database/thai_avp_graphemes.db"):
@@ -27,11 +35,39 @@ class PatternExtractor:
 
         if not self.labels_db_path.exists():
             raise FileNotFoundError(f"Labels database not found: {self.labels_db_path}")
+        self._conn = None
+
+        # sequence -> tags for every tagged grapheme, loaded up front so
+        # _get_interpretation_tags never has to query per component
+        self._tag_map = self.query_util.get_tag_map()
+
+    def _get_conn(self):
+        """Open the labels database on first use; later calls share the connection"""
+        if self._conn is None:
+            # Journal mode is left as is: it is persistent, and the labeling
+            # app shares this database
+            conn = sqlite3.connect(self.labels_db_path)
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA cache_size=-65536")      # 64 MiB page cache
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        """Close the shared connection, if one was opened"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def get_labeled_data(self) -> List[Dict]:
         """Retrieve all labeled interpretations"""
-        conn = sqlite3.connect(self.labels_db_path)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
 
         query = """
             SELECT
@@ -49,17 +85,30 @@ class PatternExtractor:
         cursor.execute(query)
         results = []
 
+        # Labels often select the same interpretation, so each distinct JSON
+        # string is parsed and tagged once: text -> (syllable, tags) or None
+        parsed = {}
+
         for row in cursor.fetchall():
             word = row[0]
-            interp_json = json.loads(row[4]) if row[4] else None
-
-            if interp_json:
-                # Get the selected interpretation details
-                syllable = interp_json['syllables'][0] if 'syllables' in interp_json else {}
-
-                # Get tags for each component
-                tags = self._get_interpretation_tags(syllable)
-
+            interp_text = row[4]
+
+            try:
+                entry = parsed[interp_text]
+            except KeyError:
+                interp_json = _loads(interp_text) if interp_text else None
+                if interp_json:
+                    # Get the selected interpretation details
+                    syllable = interp_json['syllables'][0] if 'syllables' in interp_json else {}
+
+                    # Get tags for each component
+                    entry = (syllable, self._get_interpretation_tags(syllable))
+                else:
+                    entry = None
+                parsed[interp_text] = entry
+
+            if entry:
+                syllable, tags = entry
                 results.append({
                     'word': word,
                     'interpretation': syllable,
@@ -67,47 +116,57 @@ class PatternExtractor:
                     'pattern': syllable.get('pattern', '')
                 })
 
-        conn.close()
         return results
 
+    def _tags(self, sequence) -> List[str]:
+        """Tags for a character sequence, from the prefetched map"""
+        # Same key normalisation as get_character_tags; components are
+        # plain strings in the common case, so check that first
+        if type(sequence) is not str:
+            sequence = ''.join(sequence) if isinstance(sequence, list) else str(sequence)
+        return self._tag_map.get(sequence, [])
+
     def _get_interpretation_tags(self, syllable: Dict) -> Dict:
         """Get tags for all components of an interpretation"""
         tags = {}
 
-        # Foundation tags
-        if syllable.get('foundation'):
-            foundation = syllable['foundation']
-            if isinstance(foundation, list):
-                foundation_str = ''.join(foundation)
-            else:
-                foundation_str = foundation
-            tags['foundation'] = self.query_util.get_character_tags(foundation_str)
-
-        # Vowel tags
-        if syllable.get('vowel'):
-            tags['vowel'] = self.query_util.get_character_tags(syllable['vowel'])
-
-        # Final tags
-        if syllable.get('final'):
-            final = syllable['final']
-            if isinstance(final, list):
-                final_str = ''.join(final)
-            else:
-                final_str = final
-            tags['final'] = self.query_util.get_character_tags(final_str)
+        # Foundation, vowel and final tags; _tags joins list components
+        for component in ('foundation', 'vowel', 'final'):
+            value = syllable.get(component)
+            if value:
+                tags[component] = self._tags(value)
 
         return tags
 
     def extract_tag_patterns(self) -> Dict:
         """Extract patterns based on tag combinations"""
-        labeled_data = self.get_labeled_data()
+        cursor = self._get_conn().cursor()
+
+        # Same rows as get_labeled_data, but identical interpretations are
+        # collapsed in SQL so each distinct one is parsed and tagged once
+        cursor.execute("""
+            SELECT i.interpretation_json, COUNT(*)
+            FROM labels l
+            JOIN words w ON l.word_id = w.id
+            JOIN interpretations i ON l.selected_interpretation_id = i.id
+            WHERE l.is_custom = 0
+            GROUP BY i.interpretation_json
+            ORDER BY MIN(l.id)
+        """)
+        rows = cursor.fetchall()
 
         # Pattern: (foundation_tags, vowel_tags, final_tags) -> pattern_template
         tag_patterns = defaultdict(Counter)
+        total_labeled = 0
+
+        for interp_text, label_count in rows:
+            interp_json = _loads(interp_text) if interp_text else None
+            if not interp_json:
+                continue
 
-        for item in labeled_data:
-            tags = item['tags']
-            pattern = item['pattern']
+            syllable = interp_json['syllables'][0] if 'syllables' in interp_json else {}
+            tags = self._get_interpretation_tags(syllable)
+            pattern = syllable.get('pattern', '')
 
             # Create tag signature
             foundation_tags = tuple(sorted(tags.get('foundation', [])))
@@ -115,7 +174,8 @@ class PatternExtractor:
             final_tags = tuple(sorted(tags.get('final', [])))
 
             tag_signature = (foundation_tags, vowel_tags, final_tags)
-            tag_patterns[tag_signature][pattern] += 1
+            tag_patterns[tag_signature][pattern] += label_count
+            total_labeled += label_count
 
         # Analyze patterns
         rules = []
@@ -141,65 +201,65 @@ class PatternExtractor:
 
         return {
             'rules': sorted(rules, key=lambda x: x['confidence'], reverse=True),
-            'total_labeled': len(labeled_data)
+            'total_labeled': total_labeled
         }
 
     def find_ambiguity_patterns(self) -> Dict:
         """Find patterns in how ambiguous cases are resolved"""
-        conn = sqlite3.connect(self.labels_db_path)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
 
-        # Get all words that have multiple interpretations
+        # Every word with multiple interpretations, together with the
+        # interpretation chosen by its first non-custom label (NULL if the
+        # word has not been labeled)
         query = """
-            SELECT w.word, COUNT(DISTINCT i.id) as interp_count
-            FROM words w
-            JOIN interpretations i ON w.id = i.word_id
-            GROUP BY w.id
-            HAVING interp_count > 1
+            SELECT w.word, cnt.interp_count, i.interpretation_json
+            FROM (
+                SELECT word_id, COUNT(DISTINCT id) AS interp_count
+                FROM interpretations
+                GROUP BY word_id
+                HAVING interp_count > 1
+            ) cnt
+            JOIN words w ON w.id = cnt.word_id
+            LEFT JOIN labels l ON l.id = (
+                SELECT MIN(l2.id)
+                FROM labels l2
+                JOIN interpretations i2 ON l2.selected_interpretation_id = i2.id
+                WHERE l2.word_id = w.id AND l2.is_custom = 0
+            )
+            LEFT JOIN interpretations i ON l.selected_interpretation_id = i.id
+            ORDER BY w.id
         """
 
         cursor.execute(query)
         ambiguous_words = cursor.fetchall()
 
-        ambiguity_data = []
-        for word, count in ambiguous_words:
-            # Get the chosen interpretation for this word
-            cursor.execute("""
-                SELECT l.selected_interpretation_id, i.interpretation_json
-                FROM labels l
-                JOIN words w ON l.word_id = w.id
-                JOIN interpretations i ON l.selected_interpretation_id = i.id
-                WHERE w.word = ? AND l.is_custom = 0
-            """, (word,))
-
-            result = cursor.fetchone()
-            if result:
-                selected_id, selected_json = result
-                ambiguity_data.append({
+        # Tally resolution patterns, keeping only the first 5 as examples
+        examples = []
+        resolution_patterns = Counter()
+        for word, count, selected_json in ambiguous_words:
+            if selected_json is None:
+                continue
+
+            selected = _loads(selected_json)
+            if len(examples) < 5:
+                examples.append({
                     'word': word,
                     'interpretation_count': count,
-                    'selected': json.loads(selected_json)
+                    'selected': selected
                 })
 
-        conn.close()
-
-        # Analyze patterns in ambiguity resolution
-        resolution_patterns = defaultdict(int)
-        for item in ambiguity_data:
-            syllable = item['selected']['syllables'][0] if 'syllables' in item['selected'] else {}
-            pattern = syllable.get('pattern', '')
-            resolution_patterns[pattern] += 1
+            syllable = selected['syllables'][0] if 'syllables' in selected else {}
+            resolution_patterns[syllable.get('pattern', '')] += 1
 
         return {
             'ambiguous_words': len(ambiguous_words),
             'resolution_patterns': dict(resolution_patterns),
-            'examples': ambiguity_data[:5]  # First 5 examples
+            'examples': examples
         }
 
     def get_custom_interpretation_gaps(self) -> List[Dict]:
         """Identify algorithm gaps from custom interpretations"""
-        conn = sqlite3.connect(self.labels_db_path)
-        cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
 
         query = """
             SELECT
@@ -216,7 +276,7 @@ class PatternExtractor:
 
         for row in cursor.fetchall():
             word = row[0]
-            custom = json.loads(row[1]) if row[1] else {}
+            custom = _loads(row[1]) if row[1] else {}
             notes = row[2]
 
             gaps.append({
@@ -226,30 +286,31 @@ class PatternExtractor:
                 'pattern': custom.get('pattern', '')
             })
 
-        conn.close()
         return gaps
 
     def save_patterns_to_db(self, patterns: Dict):
         """Save extracted patterns to database"""
-        conn = sqlite3.connect(self.labels_db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
 
-        for rule in patterns.get('rules', []):
-            pattern_rule = f"Tags: F={rule['foundation_tags']}, V={rule['vowel_tags']}, Final={rule['final_tags']} → {rule['pattern']}"
-
-            cursor.execute("""
-                INSERT INTO extracted_patterns (
-                    pattern_rule, pattern_data, support_count, confidence
-                ) VALUES (?, ?, ?, ?)
-            """, (
-                pattern_rule,
+        rows = [
+            (
+                f"Tags: F={rule['foundation_tags']}, V={rule['vowel_tags']}, Final={rule['final_tags']} → {rule['pattern']}",
                 json.dumps(rule),
                 rule['support'],
                 rule['confidence']
-            ))
+            )
+            for rule in patterns.get('rules', [])
+        ]
+
+        # One statement and one transaction for the whole batch
+        cursor.executemany("""
+            INSERT INTO extracted_patterns (
+                pattern_rule, pattern_data, support_count, confidence
+            ) VALUES (?, ?, ?, ?)
+        """, rows)
 
         conn.commit()
-        conn.close()
 
     def generate_report(self) -> str:
         """Generate a comprehensive pattern analysis report"""
@@ -301,20 +362,19 @@ class PatternExtractor:
 
 def main():
     """Run pattern extraction and display report"""
-    extractor = PatternExtractor()
-
-    try:
-        report = extractor.generate_report()
-        print(report)
-
-        # Save patterns to database
-        patterns = extractor.extract_tag_patterns()
-        if patterns['rules']:
-            extractor.save_patterns_to_db(patterns)
-            print("\n\n[OK] Patterns saved to database")
-
-    except Exception as e:
-        print(f"Error during pattern extraction: {e}")
+    with PatternExtractor() as extractor:
+        try:
+            report = extractor.generate_report()
+            print(report)
+
+            # Save patterns to database
+            patterns = extractor.extract_tag_patterns()
+            if patterns['rules']:
+                extractor.save_patterns_to_db(patterns)
+                print("\n\n[OK] Patterns saved to database")
+
+        except Exception as e:
+            print(f"Error during pattern extraction: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,40 +5,84 @@ Import Thai grapheme data from JSON files into the database
 
 import sqlite3
 import json
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson is optional; the stdlib parser gives the same result, just slower
+_loads = orjson.loads if orjson is not None else json.loads
+
 class ThaiDataImporter:
     def __init__(self, db_path="database/thai_avp_graphemes.db"):
         self.db_path = Path(db_path)
         if not self.db_path.exists():
             raise FileNotFoundError(f"Database not found at {self.db_path}. Run init_databases.py first.")
 
+        # name -> id, filled as categories/tags are looked up or created
+        self._cat_cache: Dict[str, int] = {}
+        self._tag_cache: Dict[str, int] = {}
+
+    @contextmanager
+    def _transaction(self):
+        """Open a connection and run the whole import in a single transaction"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("BEGIN")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            # SQLite may already have rolled back on its own (e.g. SQLITE_FULL)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # IDs created in this transaction no longer exist
+            self._cat_cache.clear()
+            self._tag_cache.clear()
+            raise
+        finally:
+            conn.close()
+
     def get_or_create_category(self, conn, category_name: str) -> int:
-        """Get category ID, creating if necessary"""
+        """Get category ID, creating if necessary (committed by the caller)"""
+        cached = self._cat_cache.get(category_name)
+        if cached is not None:
+            return cached
+
         cursor = conn.cursor()
         cursor.execute("SELECT id FROM categories WHERE name = ?", (category_name,))
         result = cursor.fetchone()
 
         if result:
-            return result[0]
+            category_id = result[0]
+        else:
+            cursor.execute("INSERT INTO categories (name) VALUES (?)", (category_name,))
+            category_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO categories (name) VALUES (?)", (category_name,))
-        conn.commit()
-        return cursor.lastrowid
+        self._cat_cache[category_name] = category_id
+        return category_id
 
     def get_or_create_tag(self, conn, tag_name: str) -> int:
-        """Get tag ID, creating if necessary"""
+        """Get tag ID, creating if necessary (committed by the caller)"""
+        cached = self._tag_cache.get(tag_name)
+        if cached is not None:
+            return cached
+
         cursor = conn.cursor()
         cursor.execute("SELECT id FROM tags WHERE name = ?", (tag_name,))
         result = cursor.fetchone()
 
         if result:
-            return result[0]
+            tag_id = result[0]
+        else:
+            cursor.execute("INSERT INTO tags (name) VALUES (?)", (tag_name,))
+            tag_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", (tag_name,))
-        conn.commit()
-        return cursor.lastrowid
+        self._tag_cache[tag_name] = tag_id
+        return tag_id
 
     def import_vowel_patterns(self, json_file: str) -> Dict:
         """Import vowel patterns with tags from JSON file"""
@@ -49,45 +93,43 @@ class ThaiDataImporter:
         print(f"Importing vowel patterns from {json_file}...")
 
         with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            data = _loads(f.read())
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._transaction() as conn:
+            cursor = conn.cursor()
 
-        # Get vowel_pattern category ID
-        category_id = self.get_or_create_category(conn, 'vowel_pattern')
+            # Get vowel_pattern category ID
+            category_id = self.get_or_create_category(conn, 'vowel_pattern')
 
-        stats = {'patterns': 0, 'tags': 0, 'links': 0}
+            stats = {'patterns': 0, 'tags': 0, 'links': 0}
 
-        # Import patterns and their tags
-        patterns_data = data.get('patterns', {})
-        for pattern, tags in patterns_data.items():
-            # Insert or get character
-            cursor.execute("""
+            # Import patterns and their tags
+            patterns_data = data.get('patterns', {})
+            cursor.executemany("""
                 INSERT OR IGNORE INTO characters (category_id, sequence, is_cluster)
                 VALUES (?, ?, 0)
-            """, (category_id, pattern))
+            """, [(category_id, pattern) for pattern in patterns_data])
+            stats['patterns'] = len(patterns_data)
 
             cursor.execute("""
-                SELECT id FROM characters
-                WHERE category_id = ? AND sequence = ?
-            """, (category_id, pattern))
-            char_id = cursor.fetchone()[0]
-            stats['patterns'] += 1
-
-            # Link tags to character
-            for tag_name in tags:
-                tag_id = self.get_or_create_tag(conn, tag_name)
-                cursor.execute("""
-                    INSERT OR IGNORE INTO character_tags (character_id, tag_id)
-                    VALUES (?, ?)
-                """, (char_id, tag_id))
-                stats['links'] += 1
-
-            stats['tags'] = len(set(tag for tags in patterns_data.values() for tag in tags))
-
-        conn.commit()
-        conn.close()
+                SELECT sequence, id FROM characters
+                WHERE category_id = ?
+            """, (category_id,))
+            char_ids = dict(cursor.fetchall())
+
+            # Link tags to characters
+            links = [
+                (char_ids[pattern], self.get_or_create_tag(conn, tag_name))
+                for pattern, tags in patterns_data.items()
+                for tag_name in tags
+            ]
+            cursor.executemany("""
+                INSERT OR IGNORE INTO character_tags (character_id, tag_id)
+                VALUES (?, ?)
+            """, links)
+            stats['links'] = len(links)
+
+            stats['tags'] = len({tag for tags in patterns_data.values() for tag in tags})
 
         print(f"[OK] Imported {stats['patterns']} vowel patterns")
         print(f"[OK] Created/linked {stats['tags']} unique tags")
@@ -103,27 +145,24 @@ class ThaiDataImporter:
         print(f"Importing foundations from {json_file}...")
 
         with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            data = _loads(f.read())
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._transaction() as conn:
+            cursor = conn.cursor()
 
-        # Get foundation category ID
-        category_id = self.get_or_create_category(conn, 'foundation')
+            # Get foundation category ID
+            category_id = self.get_or_create_category(conn, 'foundation')
 
-        stats = {'foundations': 0}
+            stats = {'foundations': 0}
 
-        # Import foundations
-        foundations = data.get('foundation', [])
-        for foundation in foundations:
-            cursor.execute("""
-                INSERT OR IGNORE INTO characters (category_id, sequence, is_cluster)
-                VALUES (?, ?, 0)
-            """, (category_id, foundation))
-            stats['foundations'] += 1
-
-        conn.commit()
-        conn.close()
+            # Import foundations
+            foundations = data.get('foundation', [])
+            for foundation in foundations:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO characters (category_id, sequence, is_cluster)
+                    VALUES (?, ?, 0)
+                """, (category_id, foundation))
+                stats['foundations'] += 1
 
         print(f"[OK] Imported {stats['foundations']} foundation consonants")
         return stats
@@ -137,32 +176,32 @@ class ThaiDataImporter:
         """
         print(f"Importing {len(clusters)} valid clusters...")
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        stats = {'clusters': 0}
-
-        for cluster_data in clusters:
-            cluster = cluster_data.get('cluster')
-            components = cluster_data.get('components', list(cluster))
-            usage_position = cluster_data.get('usage_position', None)
-            notes = cluster_data.get('notes', None)
-
-            cursor.execute("""
-                INSERT OR REPLACE INTO valid_clusters (cluster, components, usage_position, notes)
-                VALUES (?, ?, ?, ?)
-            """, (cluster, json.dumps(components), usage_position, notes))
-            stats['clusters'] += 1
-
-            # Also add to characters table as foundation with is_cluster=1
-            category_id = self.get_or_create_category(conn, 'foundation')
-            cursor.execute("""
-                INSERT OR IGNORE INTO characters (category_id, sequence, is_cluster)
-                VALUES (?, ?, 1)
-            """, (category_id, cluster))
-
-        conn.commit()
-        conn.close()
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+
+            stats = {'clusters': 0}
+
+            vc_rows = []
+            for cluster_data in clusters:
+                cluster = cluster_data.get('cluster')
+                components = cluster_data.get('components', list(cluster))
+                usage_position = cluster_data.get('usage_position', None)
+                notes = cluster_data.get('notes', None)
+                vc_rows.append((cluster, json.dumps(components), usage_position, notes))
+
+            if vc_rows:
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO valid_clusters (cluster, components, usage_position, notes)
+                    VALUES (?, ?, ?, ?)
+                """, vc_rows)
+                stats['clusters'] = len(vc_rows)
+
+                # Also add to characters table as foundation with is_cluster=1
+                category_id = self.get_or_create_category(conn, 'foundation')
+                cursor.executemany("""
+                    INSERT OR IGNORE INTO characters (category_id, sequence, is_cluster)
+                    VALUES (?, ?, 1)
+                """, [(category_id, row[0]) for row in vc_rows])
 
         print(f"[OK] Imported {stats['clusters']} valid clusters")
         return stats
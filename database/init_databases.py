@@ -201,6 +201,8 @@ class ThaiDatabaseInitializer:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_interpretations_validity ON interpretations(validity_status)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_invalid_components_interp ON invalid_components(interpretation_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_invalid_components_type ON invalid_components(component_type)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_invalid_components_type_value ON invalid_components(component_type, component_value)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_invalid_components_reason ON invalid_components(invalid_reason) WHERE invalid_reason IS NOT NULL")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_labels_word ON labels(word_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_labels_session ON labels(session_id)")
 
@@ -61,8 +61,13 @@ def migrate_database(db_path="thai_syllable_labels.db"):
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_interpretations_validity ON interpretations(validity_status)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_invalid_components_interp ON invalid_components(interpretation_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_invalid_components_type ON invalid_components(component_type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_invalid_components_type_value ON invalid_components(component_type, component_value)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_invalid_components_reason ON invalid_components(invalid_reason) WHERE invalid_reason IS NOT NULL")
     print("[OK] Created indexes")
 
+    # Refresh planner statistics so existing data uses the new indexes
+    cursor.execute("ANALYZE")
+
     conn.commit()
 
     # Verify migration
@@ -53,6 +53,29 @@ class ThaiGraphemeQuery:
         conn.close()
         return tags
 
+    def get_tag_map(self) -> Dict[str, List[str]]:
+        """Get tags for every tagged character sequence in one query
+
+        Each list matches what get_character_tags(sequence) returns.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT c.sequence, t.name
+            FROM character_tags ct
+            JOIN tags t ON t.id = ct.tag_id
+            JOIN characters c ON c.id = ct.character_id
+            ORDER BY ct.character_id, ct.tag_id
+        """)
+
+        tag_map = {}
+        for sequence, tag_name in cursor.fetchall():
+            tag_map.setdefault(sequence, []).append(tag_name)
+
+        conn.close()
+        return tag_map
+
     def get_character_info(self, sequence) -> Optional[Dict]:
         """Get complete information about a character sequence"""
         # Handle list input - convert to string